@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 
 from outputs import settings as outputs_settings
-from outputs.models import Export, Scheduler, ExportItem
+from outputs.models import Export, Scheduler, ExportItem, SchedulerExecution
 
 
 
@@ -134,6 +134,19 @@ class SchedulerAdmin(admin.ModelAdmin):
     date_hierarchy = 'created'
     search_fields = ['creator__first_name', 'creator__last_name']
     list_select_related = ['creator', 'content_type']
-    list_filter = ['routine', 'is_active', 'format', 'context', 'content_type']
+    list_filter = ['routine', 'is_active', 'is_incremental', 'format', 'context', 'content_type']
     list_display = ('id', 'is_active', 'routine', 'cron_string', 'cron_description', 'content_type', 'format', 'creator', 'created')
     autocomplete_fields = ['creator', 'recipients']
+
+
+@admin.register(SchedulerExecution)
+class SchedulerExecutionAdmin(admin.ModelAdmin):
+    date_hierarchy = 'created'
+    ordering = ['-created']
+    list_display = ['id', 'scheduler', 'export', 'status', 'total', 'created', 'started', 'finished']
+    list_filter = ['status', 'created']
+    search_fields = ['scheduler__id', 'export__id']
+    list_select_related = ['scheduler__content_type', 'export__content_type']
+    readonly_fields = ['scheduler', 'export', 'status', 'total', 'created', 'started', 'finished']
+    fields = ['scheduler', 'export', 'status', 'total', 'created', 'started', 'finished']
+    show_full_result_count = False
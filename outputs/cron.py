@@ -1,5 +1,4 @@
 from django.utils.module_loading import import_string
-from django.utils.timezone import now
 
 from outputs.jobs import execute_export
 from outputs.utils import serialize_exporter_params
@@ -11,14 +10,23 @@ def schedule_export(scheduler_id, scheduler_class_name):
     scheduler_class = import_string(scheduler_class_name)
     scheduler = scheduler_class.objects.get(pk=scheduler_id)
 
+    exporter_params = scheduler.exporter_params
+
+    # incremental scheduler exports only objects changed since its last successful execution
+    incremental_queryset = scheduler.get_incremental_queryset()
+
+    if incremental_queryset is not None:
+        exporter_params['queryset'] = incremental_queryset
+
+    # record execution, its outcome is updated by the export job
+    execution = scheduler.add_execution()
+
     # serialize params and dispatch export job in background
     dispatch_task(
         execute_export,
         scheduler.exporter_class.get_path(),
-        serialize_exporter_params(scheduler.exporter_params),
+        serialize_exporter_params(exporter_params),
         language=scheduler.language,
+        scheduler_id=scheduler.pk,
+        execution_id=execution.pk,
     )
-
-    # update list of execution datetimes
-    scheduler.executions.append(now())
-    scheduler.save(update_fields=['executions'])
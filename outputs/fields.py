@@ -0,0 +1,118 @@
+import datetime
+import inspect
+import operator
+
+from django.utils.timezone import localtime
+
+
+def get_function_arity(function):
+    """
+    Return number of positional arguments (1 or 2) the field function is going to be called with,
+    or None if it can't be resolved from its signature and has to be probed by calling it.
+    """
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        # builtins and some callables don't provide signature
+        return None
+
+    positional = [
+        parameter for parameter in parameters
+        if parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    ]
+
+    if len(positional) >= 2 or any(parameter.kind == inspect.Parameter.VAR_POSITIONAL for parameter in parameters):
+        return 2
+
+    return 1
+
+
+class ExportField(object):
+    """
+    Field definition (attribute, label, ..., function) compiled once for reading values of many objects.
+
+    Attribute path, optional [index] suffix and arity of the function are resolved in constructor,
+    get_value() only reads the value from the object.
+    """
+    def __init__(self, attribute, function=None):
+        self.attribute = attribute
+        self.index = None
+
+        if '[' in attribute and ']' in attribute:
+            start = attribute.rindex('[')
+            end = attribute.rindex(']')
+            self.index = attribute[start+1:end]
+            self.attribute = attribute[0:start]
+
+        self.getter = operator.attrgetter(self.attribute)
+        self.function = function
+        self.arity = get_function_arity(function) if function is not None else None
+
+    def get_value(self, obj):
+        # get object attribute
+        try:
+            if isinstance(obj, dict):
+                value = obj.get(self.attribute)
+            else:
+                value = self.getter(obj)
+        except AttributeError as e:
+            if 'NoneType' in str(e):
+                value = None
+            else:
+                raise e
+
+        if self.index and value is not None:
+            value = value.get(self.index, '')
+
+        # use custom lambda handler
+        if self.function is not None:
+            if self.arity == 2:
+                value = self.function(value, obj)
+            elif self.arity == 1:
+                value = self.function(value)
+            else:
+                try:
+                    value = self.function(value, obj)
+                except TypeError:
+                    value = self.function(value)
+
+        # datetime
+        if isinstance(value, datetime.datetime):
+            value = localtime(value)
+
+        return value
+
+
+class ExcelField(ExportField):
+    """
+    ExportField writing its values into xlsxwriter worksheet with precomputed cell format and write method.
+    """
+    def __init__(self, attribute, function=None, cell_format=None, is_date=False):
+        super().__init__(attribute, function)
+        self.cell_format = cell_format
+        self.write = self.write_date if is_date else self.write_value
+
+    def write_formula(self, worksheet, row, col, value):
+        formula, value = value
+        worksheet.write_formula(row, col, formula, self.cell_format, value)
+
+    def write_date(self, worksheet, row, col, value):
+        if isinstance(value, tuple) and isinstance(value[0], str):
+            self.write_formula(worksheet, row, col, value)
+        elif value:
+            # date or datetime format
+            worksheet.write_datetime(row, col, value, self.cell_format)
+        else:
+            self.write_value(worksheet, row, col, value)
+
+    def write_value(self, worksheet, row, col, value):
+        if isinstance(value, tuple) and isinstance(value[0], str):
+            self.write_formula(worksheet, row, col, value)
+            return
+
+        try:
+            # inherited string format
+            worksheet.write(row, col, value, self.cell_format)
+        except TypeError:
+            # force string format
+            worksheet.write(row, col, str(value), self.cell_format)
@@ -143,6 +143,7 @@ class SchedulerForm(forms.ModelForm):
     class Meta:
         model = Scheduler
         fields = ('routine', 'cron_string', 'is_active', 'language',
+                  'is_incremental', 'incremental_field',
                   'content_type', 'fields',
                   'format', 'context', 'exporter_path',
                   'query_string', 'recipients')
@@ -182,6 +183,8 @@ class SchedulerForm(forms.ModelForm):
                     'cron_string',
                     'language',
                     'is_active',
+                    'is_incremental',
+                    'incremental_field',
                     css_class='col-md-2'
                 )
             ),
@@ -1,11 +1,13 @@
 import logging
 
 from django.utils import translation
+from django.utils.timezone import now
 from django.utils.module_loading import import_string
 from pragmatic.utils import get_task_decorator
 
-from outputs.usecases import export_items
-from outputs.utils import deserialize_exporter_params
+from outputs.registry import get_exporter_class
+from outputs.usecases import export_items, export_shard, get_shard_ranges, merge_shards
+from outputs.utils import deserialize_exporter_params, get_current_job_id
 
 logger = logging.getLogger(__name__)
 
@@ -13,23 +15,45 @@ task = get_task_decorator("exports")
 
 
 @task
-def execute_export(exporter_class, exporter_params, language):
+def execute_export(exporter_class, exporter_params, language, scheduler_id=None, execution_id=None):
     # Reconstruct ORM objects from safe primitives (user_id -> user, etc.)
     exporter_params = deserialize_exporter_params(exporter_params)
     if isinstance(exporter_class, str):
-        exporter_class = import_string(exporter_class)
+        exporter_class = get_exporter_class(exporter_class)
 
     # init exporter
     exporter = exporter_class(**exporter_params)
     try:
-        # save export to DB
-        export = exporter.save_export()
-        logger.info(f"Export created: export_id={export.id}, total_items={export.total}")
+        from outputs.models import Export, SchedulerExecution
 
-        # send mail with export to recipients
-        export.send_mail(language, exporter_params.get('filename', None))
+        # retried job continues with the export saved by its previous attempt
+        job_id = get_current_job_id()
+        export = Export.objects.filter(job_id=job_id).first() if job_id else None
+
+        if export is None:
+            # save export to DB
+            export = exporter.save_export(job_id=job_id, scheduler_id=scheduler_id)
+            logger.info(f"Export created: export_id={export.id}, total_items={export.total}")
+        else:
+            logger.info(f"Export of retried job: export_id={export.id}, job_id={job_id}")
+
+        if execution_id is not None:
+            # outcome of the export is recorded in execution of its scheduler
+            SchedulerExecution.objects.filter(pk=execution_id).update(export=export, total=export.total)
+
+        # split large export into shards processed by multiple workers or send mail with export to recipients
+        shard_ranges = get_shard_ranges(export, exporter)
+
+        if shard_ranges:
+            logger.info(f"Export sharded: export_id={export.id}, shards={len(shard_ranges)}")
+            export.send_shards(language, shard_ranges, exporter_params.get('filename', None))
+        else:
+            export.send_mail(language, exporter_params.get('filename', None))
     except Exception as e:
         logger.error(f"Failed to execute export: exporter_class={exporter.__class__}, error={str(e)}", exc_info=True)
+
+        if execution_id is not None:
+            SchedulerExecution.objects.filter(pk=execution_id).update(status=Export.STATUS_FAILED, finished=now())
         raise
 
 @task
@@ -39,6 +63,10 @@ def mail_export_by_id(export_id, export_class_name, language, filename=None):
         export_class = import_string(export_class_name)
         export = export_class.objects.get(id=export_id)
 
+        if export.status == Export.STATUS_FINISHED:
+            logger.info(f"Export already finished: export_id={export_id}")
+            return
+
         export.status = Export.STATUS_PROCESSING
         export.save(update_fields=['status'])
 
@@ -50,3 +78,29 @@ def mail_export_by_id(export_id, export_class_name, language, filename=None):
     except Exception as e:
         logger.error(f"Failed to mail export by ID: export_id={export_id}, error={str(e)}", exc_info=True)
         raise
+
+
+@task
+def export_shard_by_id(export_id, export_class_name, language, shard_index, first_id, next_id, filename=None):
+    try:
+        export_class = import_string(export_class_name)
+        export = export_class.objects.get(id=export_id)
+
+        # write part of export
+        export_shard(export, shard_index, first_id, next_id, language, filename)
+    except Exception as e:
+        logger.error(f"Failed to export shard: export_id={export_id}, shard_index={shard_index}, error={str(e)}", exc_info=True)
+        raise
+
+
+@task
+def merge_export_by_id(export_id, export_class_name, language, filename=None):
+    try:
+        export_class = import_string(export_class_name)
+        export = export_class.objects.get(id=export_id)
+
+        # merge parts of export and mail it
+        merge_shards(export, language, filename)
+    except Exception as e:
+        logger.error(f"Failed to merge export: export_id={export_id}, error={str(e)}", exc_info=True)
+        raise
@@ -4,7 +4,8 @@ from outputs.models import Scheduler
 
 
 def reschedule_schedulers(*args, **kwargs):
-    for scheduler in Scheduler.objects.all():
+    # load only columns existing at this migration, fields added later are not in the table yet
+    for scheduler in Scheduler.objects.only('id', 'routine', 'cron_string', 'is_active', 'job_id'):
         scheduler.schedule()
 
 
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0023_update_xml_mrp_to_xml'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='shards_total',
+            field=models.PositiveIntegerField(default=0, help_text='Number of shards or checkpoints of the export', verbose_name='parts'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='shards_finished',
+            field=models.PositiveIntegerField(default=0, help_text='Number of written shards or checkpoints of the export', verbose_name='finished parts'),
+        ),
+    ]
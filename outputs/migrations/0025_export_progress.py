@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0024_export_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='processed',
+            field=models.PositiveIntegerField(default=0, verbose_name='processed items'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='started',
+            field=models.DateTimeField(blank=True, default=None, null=True, verbose_name='started'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0025_export_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='job_id',
+            field=models.CharField(blank=True, db_index=True, max_length=36, verbose_name='job ID'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0026_export_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedOutput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='key')),
+                ('path', models.CharField(max_length=255, verbose_name='path')),
+                ('size', models.PositiveBigIntegerField(verbose_name='size')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('used', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='used')),
+            ],
+            options={
+                'verbose_name': 'cached output',
+                'verbose_name_plural': 'cached outputs',
+                'ordering': ('used',),
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0027_cachedoutput'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduler',
+            name='is_incremental',
+            field=models.BooleanField(default=False, verbose_name='incremental'),
+        ),
+        migrations.AddField(
+            model_name='scheduler',
+            name='incremental_field',
+            field=models.CharField(blank=True, max_length=40, verbose_name='incremental field'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='scheduler',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exports', to='outputs.scheduler', verbose_name='scheduler'),
+        ),
+    ]
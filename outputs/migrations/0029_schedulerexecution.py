@@ -0,0 +1,52 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+from outputs import settings as outputs_settings
+
+
+def copy_executions(apps, schema_editor):
+    Scheduler = apps.get_model('outputs', 'Scheduler')
+    SchedulerExecution = apps.get_model('outputs', 'SchedulerExecution')
+    retention = outputs_settings.SCHEDULER_EXECUTIONS_RETENTION
+
+    # raw values are read, reverse relation of SchedulerExecution shadows the executions field on Scheduler instances
+    for scheduler_id, executions in Scheduler.objects.exclude(executions=[]).values_list('id', 'executions').iterator():
+        executions = executions[-retention:] if retention else executions
+
+        # outcome of previous executions wasn't recorded
+        SchedulerExecution.objects.bulk_create(
+            [SchedulerExecution(scheduler_id=scheduler_id, status='', created=created) for created in executions],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0028_scheduler_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerExecution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(blank=True, choices=[('PENDING', 'pending'), ('PROCESSING', 'processing'), ('FAILED', 'failed'), ('FINISHED', 'finished')], default='PENDING', max_length=10, verbose_name='status')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='total items')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+                ('started', models.DateTimeField(blank=True, default=None, null=True, verbose_name='started')),
+                ('finished', models.DateTimeField(blank=True, default=None, null=True, verbose_name='finished')),
+                ('export', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduler_executions', to='outputs.export', verbose_name='export')),
+                ('scheduler', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='executions', to='outputs.scheduler', verbose_name='scheduler')),
+            ],
+            options={
+                'verbose_name': 'scheduler execution',
+                'verbose_name_plural': 'scheduler executions',
+                'ordering': ('-created',),
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+                'indexes': [models.Index(fields=['scheduler', 'created'], name='outputs_sch_schedul_203a29_idx')],
+            },
+        ),
+        migrations.RunPython(copy_executions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0029_schedulerexecution'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='scheduler',
+            name='executions',
+        ),
+    ]
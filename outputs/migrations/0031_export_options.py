@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outputs', '0030_remove_scheduler_executions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='options',
+            field=models.JSONField(blank=True, default=dict, verbose_name='options'),
+        ),
+    ]
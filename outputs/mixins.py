@@ -1,22 +1,29 @@
+import codecs
+import collections
 import concurrent.futures
-import datetime
+import csv
 import io
+import itertools
 import json
-import math
-import operator
+import multiprocessing
+import multiprocessing.util
+import pickle
+import shutil
+import tempfile
 
 from django.conf import settings as django_settings
 from django.contrib import messages
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import Paginator
-from django.db.models import Count, QuerySet
-from django.http import HttpResponse
+from django.db import connections, transaction
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template import loader
 from django.utils import translation
-from django.utils.timezone import localtime
+from django.utils.module_loading import import_string
 
 from outputs.jobs import execute_export
-from outputs.utils import serialize_exporter_params
+from outputs.utils import COMPRESSION_FORMATS, compress_chunks, queryset_chunks, serialize_exporter_params
 
 try:
     # older Django
@@ -28,9 +35,26 @@ except ImportError:
 from pragmatic.utils import dispatch_task
 from pragmatic.templatetags.pragmatic_tags import filtered_values
 from outputs import settings
+from outputs.fields import ExcelField, ExportField
 from outputs.forms import ChooseExportFieldsForm, ConfirmExportForm
 from outputs.models import Export
 
+# exporter formatting chunks in a worker process, set by init_process_worker() after the worker is forked
+process_worker_state = None
+
+
+def init_process_worker(exporter, fields, iterative_sets_fields, objects):
+    global process_worker_state
+    process_worker_state = (exporter, fields, iterative_sets_fields, objects)
+
+    # connections were closed before forking, the worker opens its own and closes them when it exits
+    multiprocessing.util.Finalize(None, connections.close_all, exitpriority=10)
+
+
+def get_process_chunk_rows(pks):
+    exporter, fields, iterative_sets_fields, objects = process_worker_state
+    return exporter.get_indexed_rows(fields, iterative_sets_fields, objects, pks)
+
 
 class ExportFieldsPermissionsMixin(object):
     def load_export_fields_permissions(self, permissions):
@@ -160,8 +184,36 @@ class ConfirmExportMixin(object):
             language=translation.get_language(),
         )
 
+    def get_count_params(self):
+        """
+        Return params to count exported objects by exporter class, None if they have to be counted by exporter instance
+        """
+        view_class = type(self)
+
+        if view_class.get_exporter is not ConfirmExportMixin.get_exporter:
+            return None
+
+        if view_class.exporter_params in [ConfirmExportMixin.exporter_params, SelectExportMixin.exporter_params]:
+            return self.get_params()
+
+        # overridden exporter params may narrow the objects of the exporter class
+        exporter_params = self.exporter_params
+
+        if 'queryset' in exporter_params or 'filter_class' in exporter_params:
+            return None
+
+        return exporter_params.get('params', self.get_params())
+
     def get_objects_count(self):
-        return self.get_exporter().get_queryset().count()
+        # objects are counted from exporter class if possible, without instantiating the exporter
+        count_objects = getattr(self.exporter_class, 'count_objects', None)
+        params = self.get_count_params() if count_objects is not None else None
+        count = count_objects(params) if params is not None else None
+
+        if count is None:
+            count = self.get_exporter().get_queryset().count()
+
+        return count
 
     def form_valid(self, form):
         self.recipients = form.cleaned_data.pop('recipients')
@@ -254,6 +306,13 @@ class ExporterMixin(object):
     description = ''
     url = ''
     language = 'en'
+    export_item_detail = True
+    compression = settings.COMPRESSION
+    shard_size = settings.SHARD_SIZE
+    checkpoint_size = settings.CHECKPOINT_SIZE
+    supports_parts = False
+    cache_output = True
+    option_names = ['compression', 'shard_size', 'checkpoint_size']
 
     def __init__(self, user, recipients, **kwargs):
         self.queryset = kwargs.pop('queryset', self.queryset)
@@ -262,11 +321,28 @@ class ExporterMixin(object):
         self.filename = kwargs.pop('filename', self.filename)
         self.output_type = kwargs.pop('output_type', self.output_type)
         self.send_separately = kwargs.pop('send_separately', self.send_separately)
+        self.compression = kwargs.pop('compression', self.compression)
+        self.shard_size = kwargs.pop('shard_size', self.shard_size)
+        self.checkpoint_size = kwargs.pop('checkpoint_size', self.checkpoint_size)
         self.user = user
         self.recipients = recipients
 
-        # initialize stream
-        self.output = io.BytesIO()
+        # progress of the export, set when exporting in a job (see outputs.usecases.ExportProgress)
+        self.progress = kwargs.pop('progress', None)
+
+        # initialize stream, kept in memory until it grows over SPOOL_MAX_SIZE, then spilled to disk
+        self.output = tempfile.SpooledTemporaryFile(max_size=settings.SPOOL_MAX_SIZE)
+        self.is_output_compressed = False
+
+    def get_options(self):
+        """
+        Return options overridden by constructor kwargs, saved with the export
+        so queued jobs rebuild the exporter with the same options
+        """
+        return {
+            name: getattr(self, name) for name in self.option_names
+            if getattr(self, name) != getattr(self.__class__, name)
+        }
 
     @classmethod
     def get_model(cls):
@@ -276,6 +352,22 @@ class ExporterMixin(object):
     def get_app_and_model(cls):
         return cls.get_model()._meta.label.split('.')
 
+    @classmethod
+    def customizes_queryset(cls):
+        """
+        Return True if exported objects are selected by overridden methods instead of queryset of the exporter,
+        so they can't be limited by queryset passed to the constructor
+        """
+        return cls.get_queryset is not ExporterMixin.get_queryset
+
+    @classmethod
+    def count_objects(cls, params):
+        """
+        Return number of exported objects counted without instantiating the exporter,
+        None if they have to be counted by exporter instance
+        """
+        return None
+
     @classmethod
     def get_path(cls):
         return ".".join([cls.__module__, cls.__name__])
@@ -325,9 +417,100 @@ class ExporterMixin(object):
     def write_data(self, output):
         raise NotImplementedError()
 
+    def export_part(self, part):
+        """
+        Write part of the export (objects of the queryset) into part file, to be merged by merge_parts()
+        """
+        raise NotImplementedError()
+
+    def merge_parts(self, parts):
+        """
+        Write output from part files written by export_part() in their order
+        """
+        raise NotImplementedError()
+
+    def report_progress(self, count):
+        """
+        Report number of objects written since the last report, called once per chunk of objects
+        """
+        if self.progress is not None:
+            self.progress.add(count)
+
+    def get_output_filename(self, filename=None):
+        """
+        Return filename of the output, with extension of compression if it is compressed
+        """
+        filename = filename or self.get_filename()
+
+        if self.compression:
+            filename += COMPRESSION_FORMATS[self.compression][0]
+
+        return filename
+
+    def get_output_content_type(self):
+        if self.compression:
+            return COMPRESSION_FORMATS[self.compression][1]
+
+        return self.content_type
+
+    def compress_output(self):
+        """
+        Replace output by its compressed version, compressed by chunks
+        """
+        output = self.output
+        output.seek(0)
+        chunks = iter(lambda: output.read(io.DEFAULT_BUFFER_SIZE * 16), b'')
+
+        self.output = tempfile.SpooledTemporaryFile(max_size=settings.SPOOL_MAX_SIZE)
+        for data in compress_chunks(chunks, self.compression, self.get_filename()):
+            self.output.write(data)
+
+        output.close()
+        self.is_output_compressed = True
+
     def get_output(self):
+        return self.get_output_file().read()
+
+    def load_output(self, output_file):
+        """
+        Replace the output by the content of output_file, the stored output of an identical export
+        """
         self.output.seek(0)
-        return self.output.read()
+        self.output.truncate()
+        shutil.copyfileobj(output_file, self.output)
+
+        # stored output is already compressed
+        self.is_output_compressed = bool(self.compression)
+
+    def get_cache_version(self):
+        """
+        Return token changed by every change of the exported data, or None if it can't be determined.
+
+        Identical exports reuse the output of each other only while the token is the same (see outputs.usecases.
+        get_output_cache_key()). OUTPUTS_OUTPUT_CACHE_VERSION callable is called with the exporter if set,
+        otherwise the token is the latest `modified` value of the exported objects.
+        """
+        if settings.OUTPUT_CACHE_VERSION:
+            return import_string(settings.OUTPUT_CACHE_VERSION)(self)
+
+        queryset = self.get_queryset()
+
+        try:
+            queryset.model._meta.get_field('modified')
+        except FieldDoesNotExist:
+            return None
+
+        return queryset.order_by().aggregate(version=Max('modified'))['version']
+
+    def get_output_file(self):
+        """
+        Return output stream rewound to its beginning, for consumers reading it without making a copy in memory
+        """
+        if self.compression and not self.is_output_compressed:
+            self.compress_output()
+
+        self.output.seek(0)
+        return self.output
 
     def export_to_response(self):
         self.export()
@@ -335,10 +518,10 @@ class ExporterMixin(object):
         # construct response
         response = HttpResponse(
             self.get_output(),
-            content_type=self.content_type,
+            content_type=self.get_output_content_type(),
         )
         response['Content-Disposition'] = "attachment; filename={}".format(
-            self.get_filename()
+            self.get_output_filename()
         )
 
         return response
@@ -369,9 +552,39 @@ class ExporterMixin(object):
                 target=export.content_type,
             )
 
-    def save_export(self):
+    def create_export_items(self, export, content_type, items):
+        """
+        Create ExportItem for every object of the items queryset and return number of created items.
+
+        With export_item_detail the objects are streamed in chunks to store their string representation,
+        otherwise the items are inserted by a single INSERT ... SELECT statement without fetching any objects.
+        """
+        from outputs.models import ExportItem
+
+        if not self.export_item_detail:
+            return ExportItem.objects.insert_from_queryset(export, content_type, items)
+
+        total = 0
+
+        for chunk in queryset_chunks(items, settings.CHUNK_SIZE):
+            export_items = [
+                ExportItem(
+                    export=export,
+                    content_type=content_type,
+                    object_id=item.pk,
+                    detail=str(item),
+                    result='',
+                )
+                for item in chunk
+            ]
+            ExportItem.objects.bulk_create(export_items, batch_size=1000)
+            total += len(export_items)
+
+        return total
+
+    def save_export(self, job_id='', scheduler_id=None):
         items = self.get_queryset()
-        model = self.queryset.model if self.queryset else self.model
+        model = self.queryset.model if self.queryset is not None else self.model
         params = getattr(self, 'params', {})
 
         fields = getattr(self, 'selected_fields', None)
@@ -389,34 +602,28 @@ class ExporterMixin(object):
 
         # track export
         content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
-        export = Export.objects.create(
-            content_type=content_type,
-            format=self.export_format,
-            context=self.export_context,
-            output_type=self.output_type,
-            exporter_path=".".join([self.__class__.__module__, self.__class__.__name__]),
-            fields=fields,
-            creator=self.user,
-            query_string=params.urlencode() if params else "",
-            total=items.count(),
-            url=self.url,
-            emails=[recipient.email for recipient in self.recipients]
-        )
-        export.recipients.add(*list(self.recipients))
 
-        # Create ExportItem entries for each item
-        from outputs.models import ExportItem
-        export_items = [
-            ExportItem(
-                export=export,
+        with transaction.atomic():
+            export = Export.objects.create(
                 content_type=content_type,
-                object_id=item.pk,
-                detail=str(item),
-                result='',
+                format=self.export_format,
+                context=self.export_context,
+                output_type=self.output_type,
+                exporter_path=".".join([self.__class__.__module__, self.__class__.__name__]),
+                fields=fields,
+                creator=self.user,
+                query_string=params.urlencode() if params else "",
+                url=self.url,
+                emails=[recipient.email for recipient in self.recipients],
+                job_id=job_id or '',
+                options=self.get_options(),
+                scheduler_id=scheduler_id
             )
-            for item in items
-        ]
-        ExportItem.objects.bulk_create(export_items, batch_size=1000)
+            export.recipients.add(*list(self.recipients))
+
+            # Create ExportItem entries for each item, number of created items is the total
+            export.total = self.create_export_items(export, content_type, items)
+            export.save(update_fields=['total'])
 
         if 'whistle' in django_settings.INSTALLED_APPS:
             self._notify_executed_export_superusers(export)
@@ -435,6 +642,24 @@ class FilterExporterMixin(ExporterMixin):
         # create filter
         self.filter = self.get_filter()
 
+    @classmethod
+    def customizes_queryset(cls):
+        return any(
+            getattr(cls, method) is not getattr(FilterExporterMixin, method)
+            for method in ['get_filter', 'get_whole_queryset', 'get_queryset']
+        )
+
+    @classmethod
+    def count_objects(cls, params):
+        # exporter customizing its querysets or filter is counted by its instance
+        if cls.customizes_queryset():
+            return None
+
+        if cls.filter_class is None or cls.queryset is None or params.get('proxy', None):
+            return None
+
+        return cls.filter_class(params, queryset=cls.queryset).qs.count()
+
     def get_filter(self):
         return self.filter_class(self.params, queryset=self.get_whole_queryset(self.params))
 
@@ -474,6 +699,10 @@ class ExcelExporterMixin(ExporterMixin):
     }
     proxy_class = None
     exclude_in_permission_widget = False
+    constant_memory = False
+    processes = settings.NUMBER_OF_PROCESSES
+    supports_parts = True
+    option_names = ExporterMixin.option_names + ['constant_memory', 'processes']
 
     @staticmethod
     def selectable_fields():
@@ -481,11 +710,19 @@ class ExcelExporterMixin(ExporterMixin):
 
     def __init__(self, **kwargs):
         self.selected_fields = kwargs.get('selected_fields', None)
+        self.constant_memory = kwargs.pop('constant_memory', self.constant_memory)
+        self.processes = kwargs.pop('processes', self.processes)
         super().__init__(**kwargs)
 
-        # create a workbook in memory
         import xlsxwriter
-        self.workbook = xlsxwriter.Workbook(self.output)
+
+        if self.constant_memory:
+            # flush every finished row to a temp file
+            self.workbook = xlsxwriter.Workbook(self.output, {'constant_memory': True})
+        else:
+            # create a workbook with worksheets kept in memory
+            self.workbook = xlsxwriter.Workbook(self.output)
+
         self.workbook.remove_timezone = True
 
         # Add formats
@@ -527,65 +764,31 @@ class ExcelExporterMixin(ExporterMixin):
     def get_function(self, field):
         return field[4]
 
-    def write_row(self, worksheet, row, col, obj, field):
-        translation.activate(self.language)
-
-        attr_index = None
-        attr = self.get_attribute(field)
-
-        if '[' in attr and ']' in attr:
-            start = attr.rindex('[')
-            end = attr.rindex(']')
-            attr_index = attr[start+1:end]
-            attr = attr[0:start]
-
-        # get cell format
+    def compile_field(self, field):
+        """
+        Return ExcelField resolving attribute, function, cell format and write method of the field definition once
+        """
         cell_format_identifier = self.get_cell_format(field)
-        cell_format = self.formats.get(cell_format_identifier, None)
 
-        # get object attribute
         try:
-            if isinstance(obj, dict):
-                value = obj.get(attr)
-            else:
-                value = operator.attrgetter(attr)(obj)
-        except AttributeError as e:
-            if 'NoneType' in str(e):
-                value = None
-            else:
-                raise e
-
-        if attr_index and value is not None:
-            value = value.get(attr_index, '')
-
-        # try to use custom lambda handler
-        try:
-            func = self.get_function(field)
-            value = func(value, obj)
-        except TypeError:
-            value = func(value)
+            function = self.get_function(field)
         except IndexError:
-            pass
+            function = None
 
-        if isinstance(value, tuple) and isinstance(value[0], str):
-            # formula
-            formula, value = value
-            worksheet.write_formula(row, col, formula, cell_format, value)
-        else:
-            # datetime
-            if isinstance(value, datetime.datetime):
-                value = localtime(value)
+        return ExcelField(
+            self.get_attribute(field),
+            function=function,
+            cell_format=self.formats.get(cell_format_identifier, None),
+            is_date=bool(cell_format_identifier and 'date' in cell_format_identifier)
+        )
 
-            if cell_format_identifier and 'date' in cell_format_identifier and value:
-                # date or datetime format
-                worksheet.write_datetime(row, col, value, cell_format)
-            else:
-                try:
-                    # inherited string format
-                    worksheet.write(row, col, value, cell_format)
-                except TypeError:
-                    # force string format
-                    worksheet.write(row, col, str(value), cell_format)
+    def compile_fields(self, fields, iterative_sets_fields):
+        compiled_fields = [self.compile_field(field) for field in fields]
+        compiled_iterative_sets_fields = [
+            dict(iter_set, fields=[self.compile_field(field) for field in iter_set['fields']])
+            for iter_set in iterative_sets_fields
+        ]
+        return compiled_fields, compiled_iterative_sets_fields
 
     def write_header(self, worksheet, fields, iterative_sets_fields):
         last_col = 0
@@ -622,57 +825,215 @@ class ExcelExporterMixin(ExporterMixin):
 
     def write_content(self, worksheet, fields, iterative_sets_fields, objects):
         # Write actual data. Start from the first cell. Rows and columns are zero indexed.
-        row = 1
-        max_col = 0
-        paginator = self.get_paginator(objects)
+        # Chunks are fetched by this thread and formatted by worker threads, rows are written by this thread in order,
+        # which also suits constant memory workbook flushing every finished row.
+        compiled_fields, compiled_iterative_sets_fields = self.compile_fields(fields, iterative_sets_fields)
+        objects = self.prefetch_iterative_sets(objects, iterative_sets_fields)
+
+        if self.use_processes():
+            rows = self.iterate_process_rows(
+                compiled_fields, compiled_iterative_sets_fields, objects, iterative_sets_fields
+            )
+        else:
+            chunks = self.count_iterations(self.get_chunks(objects), iterative_sets_fields)
+            rows = self.iterate_rows(compiled_fields, compiled_iterative_sets_fields, chunks)
 
-        # If a paginator is defined, process each page in a separate thread
-        if paginator and isinstance(paginator, Paginator):
-            with concurrent.futures.ThreadPoolExecutor(max_workers=settings.NUMBER_OF_THREADS) as executor:
-                futures = {
-                    executor.submit(self.write_objects, worksheet, fields, iterative_sets_fields, paginator.page(page_number).object_list, (page_number - 1) * paginator.per_page + 1,
-                                    max_col): page_number
-                    for page_number in paginator.page_range}
+        row, max_col = self.write_rows(worksheet, rows, 1, 0)
 
-                for future in concurrent.futures.as_completed(futures):
-                    page_number = futures[future]
+        worksheet.autofilter(0, 0, row - 1, max_col - 1)
+        worksheet.freeze_panes(1, 0)
 
-                    try:
-                        result_row, result_max_col = future.result()
-                        row = max(row, result_row)
-                        max_col = max(max_col, result_max_col)
+    def prefetch_iterative_sets(self, objects, iterative_sets_fields):
+        """
+        Prefetch relatives of iterative sets written into the worksheet, so each chunk costs
+        one query per set instead of one query per object and set
+        """
+        prefetched = {getattr(lookup, 'prefetch_to', lookup) for lookup in objects._prefetch_related_lookups}
+        lookups = [
+            iter_set['set_attr'] for iter_set in iterative_sets_fields
+            if iter_set['fields'] and iter_set['set_attr'] not in prefetched
+        ]
 
-                    except Exception as exc:
-                        print(f"Page {page_number} generated an exception: {exc}")
+        if not lookups:
+            return objects
 
-        else:
-            row, max_col = self.write_objects(worksheet, fields, iterative_sets_fields, objects, row, max_col)
+        return objects.prefetch_related(*lookups)
 
-        worksheet.autofilter(0, 0, row - 1, max_col - 1)
-        worksheet.freeze_panes(1, 0)
+    def iterate_rows(self, fields, iterative_sets_fields, chunks):
+        """
+        Yield rows of cell values of all chunks in their original order.
+
+        Chunks are formatted by NUMBER_OF_THREADS worker threads, at most NUMBER_OF_THREADS
+        chunks ahead of the consumer. Exceptions of workers are re-raised.
+        """
+        workers = settings.NUMBER_OF_THREADS
+        pending = collections.deque()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for chunk in chunks:
+                    pending.append(executor.submit(self.get_chunk_rows, fields, iterative_sets_fields, chunk))
+
+                    if len(pending) >= workers:
+                        yield from self.iterate_reported_rows(pending.popleft().result())
+
+                while pending:
+                    yield from self.iterate_reported_rows(pending.popleft().result())
+            finally:
+                # do not let workers fetch chunks nobody is going to write
+                for future in pending:
+                    future.cancel()
+
+    def use_processes(self):
+        """
+        Return True if chunks are going to be formatted by worker processes instead of threads.
+
+        Workers are forked, so the fork start method has to be available. They read the objects
+        by their own database connections, which can't see uncommitted changes of an open transaction,
+        so threads are used inside atomic blocks.
+        """
+        if not self.processes or 'fork' not in multiprocessing.get_all_start_methods():
+            return False
+
+        return not any(connection.in_atomic_block for connection in connections.all())
+
+    def iterate_process_rows(self, fields, iterative_sets_fields, objects, counted_sets_fields):
+        """
+        Yield rows of cell values of all objects in their original order, formatted by worker processes.
+
+        This process streams primary keys of the objects and sends them to `processes` forked workers
+        by chunks of CHUNK_SIZE, at most `processes` chunks ahead of the consumer. Workers fetch the objects
+        of their chunk, run the field functions and return rows of (column index, value) tuples
+        (see get_indexed_rows()), so only primary keys and plain values are passed between processes.
+        Number of iterations of counted_sets_fields with unknown number of iterations is counted from
+        the numbers of relatives returned by workers. Exceptions of workers are re-raised.
+        """
+        columns = self.get_column_indexes(fields, iterative_sets_fields)
+        counted_sets = [
+            index for index, iter_set in enumerate(counted_sets_fields) if iter_set['iteration_number'] is None
+        ]
+
+        for index in counted_sets:
+            counted_sets_fields[index]['iteration_number'] = 0
+
+        def iterate_chunk_rows(result):
+            rows, relatives_counts = result.get()
 
-    def write_objects(self, worksheet, fields, iterative_sets_fields, objects, row, max_col):
-        for obj in objects:
-            col = 0
+            for index in counted_sets:
+                counted_sets_fields[index]['iteration_number'] = max(
+                    counted_sets_fields[index]['iteration_number'], relatives_counts[index]
+                )
 
-            for field in fields:
-                if self.proxy_class:
-                    obj.__class__ = self.proxy_class
-                self.write_row(worksheet, row, col, obj, field)
-                col += 1
+            for values in rows:
+                yield [(columns[index], value) for index, value in values]
 
-            for iter_set in iterative_sets_fields:
-                for relative in getattr(obj, iter_set['set_attr']).all():
-                    for field in iter_set['fields']:
-                        self.write_row(worksheet, row, col, relative, field)
-                        col += 1
+            self.report_progress(len(rows))
 
-            max_col = max(col, max_col)
+        # forked workers must not share connections of this process
+        connections.close_all()
+
+        pool = multiprocessing.get_context('fork').Pool(
+            self.processes, initializer=init_process_worker, initargs=(self, fields, iterative_sets_fields, objects)
+        )
+        pending = collections.deque()
+
+        try:
+            pks = objects.prefetch_related(None).values_list('pk', flat=True).iterator(chunk_size=settings.CHUNK_SIZE)
+
+            for chunk in iter(lambda: list(itertools.islice(pks, settings.CHUNK_SIZE)), []):
+                pending.append(pool.apply_async(get_process_chunk_rows, (chunk,)))
+
+                if len(pending) >= self.processes:
+                    yield from iterate_chunk_rows(pending.popleft())
+
+            while pending:
+                yield from iterate_chunk_rows(pending.popleft())
+
+            # let workers close their connections
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+
+    def get_indexed_rows(self, fields, iterative_sets_fields, objects, pks):
+        """
+        Return rows of (column index, value) tuples of objects with the primary keys in their order
+        and maximum numbers of relatives of iterative sets. Runs in a worker process.
+        """
+        translation.activate(self.language)
+        columns = self.get_column_indexes(fields, iterative_sets_fields)
+        indexes = {id(field): index for index, field in enumerate(columns)}
+        objects_by_pk = objects.in_bulk(pks)
+        relatives_counts = [0] * len(iterative_sets_fields)
+        rows = []
+
+        for pk in pks:
+            obj = objects_by_pk.get(pk)
+
+            if obj is None:
+                # deleted in the meantime
+                continue
+
+            values = self.get_row_values(obj, fields, iterative_sets_fields)
+            rows.append([(indexes[id(field)], value) for field, value in values])
+
+            for index, iter_set in enumerate(iterative_sets_fields):
+                if iter_set['fields']:
+                    relatives_counts[index] = max(relatives_counts[index], len(getattr(obj, iter_set['set_attr']).all()))
+
+        return rows, relatives_counts
+
+    def iterate_reported_rows(self, rows):
+        yield from rows
+        self.report_progress(len(rows))
+
+    def get_chunk_rows(self, fields, iterative_sets_fields, chunk):
+        # runs in a worker thread which has its own database connection
+        try:
+            return self.get_rows(fields, iterative_sets_fields, chunk)
+        finally:
+            connections.close_all()
+
+    def get_rows(self, fields, iterative_sets_fields, objects):
+        translation.activate(self.language)
+        return [self.get_row_values(obj, fields, iterative_sets_fields) for obj in objects]
+
+    def get_row_values(self, obj, fields, iterative_sets_fields):
+        """
+        Return list of (ExcelField, value) tuples of all cells in the row of the object
+        """
+        if self.proxy_class:
+            obj.__class__ = self.proxy_class
+
+        values = [(field, field.get_value(obj)) for field in fields]
+
+        for iter_set in iterative_sets_fields:
+            if not iter_set['fields']:
+                continue
+
+            for relative in getattr(obj, iter_set['set_attr']).all():
+                for field in iter_set['fields']:
+                    values.append((field, field.get_value(relative)))
+
+        return values
+
+    def write_rows(self, worksheet, rows, row, max_col):
+        for values in rows:
+            for col, (field, value) in enumerate(values):
+                field.write(worksheet, row, col, value)
+
+            max_col = max(len(values), max_col)
             row += 1
 
         return row, max_col
 
-    def get_selected_fields(self, objects):
+    def get_selected_fields(self, objects, count_iterations=True):
+        """
+        Return selected fields and iterative sets of selected fields.
+
+        Number of iterations of the sets is counted by a single aggregate query per set if count_iterations is set,
+        otherwise it is left None to be counted while writing the content (see count_iterations()).
+        """
         fields = []
 
         for field_set in self.selectable_fields().values():
@@ -685,31 +1046,55 @@ class ExcelExporterMixin(ExporterMixin):
 
         if hasattr(self, 'selectable_iterative_sets'):
             for set_attribute in self.selectable_iterative_sets().keys():
-                # get number of iterations
                 relatives_name = set_attribute[:-4]
 
-                object_with_max_relatives = objects.annotate(
-                    num_relatives=Count(relatives_name)
-                ).order_by('-num_relatives')[0]
-                iteration_number = object_with_max_relatives.num_relatives
-
                 iterative_fields = []
                 for field_set in self.selectable_iterative_sets()[set_attribute].values():
                     for field in field_set:
                         if self.get_attribute(field) in self.selected_fields:
                             iterative_fields.append(field)
 
-                relatives_verbose_name = getattr(object_with_max_relatives, set_attribute).first()._meta.verbose_name
+                # get number of iterations
+                if not iterative_fields:
+                    # set without selected fields doesn't produce any column
+                    iteration_number = 0
+                elif count_iterations:
+                    iteration_number = objects.order_by().annotate(
+                        num_relatives=Count(relatives_name)
+                    ).aggregate(max_relatives=Max('num_relatives'))['max_relatives'] or 0
+                else:
+                    iteration_number = None
+
+                relatives_model = objects.model._meta.get_field(relatives_name).related_model
 
                 iterative_sets_fields.append({
                     'set_attr': set_attribute,
                     'fields': iterative_fields,
                     'iteration_number': iteration_number,
-                    'verbose_name': relatives_verbose_name,
+                    'verbose_name': relatives_model._meta.verbose_name,
                 })
 
         return fields, iterative_sets_fields
 
+    def count_iterations(self, chunks, iterative_sets_fields):
+        """
+        Yield chunks while counting the maximum number of relatives of iterative sets with unknown number of iterations.
+        Relatives are prefetched (see prefetch_iterative_sets()), counting them doesn't query the database.
+        """
+        counted_sets = [iter_set for iter_set in iterative_sets_fields if iter_set['iteration_number'] is None]
+
+        for iter_set in counted_sets:
+            iter_set['iteration_number'] = 0
+
+        for chunk in chunks:
+            for iter_set in counted_sets:
+                for obj in chunk:
+                    iter_set['iteration_number'] = max(
+                        iter_set['iteration_number'], len(getattr(obj, iter_set['set_attr']).all())
+                    )
+
+            yield chunk
+
     def write_data(self, worksheet):
         # get data
         objects = self.get_queryset()
@@ -717,23 +1102,221 @@ class ExcelExporterMixin(ExporterMixin):
         if not objects.exists():
             return
 
+        # constant memory workbook is written row by row, so the header has to be written first
+        # and the number of iterations of iterative sets is counted in advance,
+        # otherwise it is counted while writing the content and the header is written afterwards
+        header_first = self.constant_memory
+
         # use only selected fields
-        fields, iterative_sets_fields = self.get_selected_fields(objects)
+        fields, iterative_sets_fields = self.get_selected_fields(objects, count_iterations=header_first)
 
         # write header and set columns width
-        self.write_header(worksheet, fields, iterative_sets_fields)
+        if header_first:
+            self.write_header(worksheet, fields, iterative_sets_fields)
 
         # write content
         self.write_content(worksheet, fields, iterative_sets_fields, objects)
 
-        # write header and content for fields requiring iteration over multiple related objects if there are any
-        # self.write_iterative_sets(worksheet, fields, objects)
+        if not header_first:
+            self.write_header(worksheet, fields, iterative_sets_fields)
 
-    def get_paginator(self, objects):
-        count = objects.count()
+    def get_chunks(self, objects):
+        return queryset_chunks(objects, settings.CHUNK_SIZE)
 
-        if count > settings.NUMBER_OF_THREADS:
-            per_page = math.ceil(count / settings.NUMBER_OF_THREADS)
-            return Paginator(objects, per_page)
+    def get_column_indexes(self, fields, iterative_sets_fields):
+        """
+        Return list of compiled fields and iterative sets fields, which identifies them by their index in parts
+        """
+        return fields + [field for iter_set in iterative_sets_fields for field in iter_set['fields']]
 
-        return None
+    def export_part(self, part):
+        # rows of cell values are pickled by batches as (column index, value) tuples
+        objects = self.get_queryset()
+
+        if not objects.exists():
+            return
+
+        fields, iterative_sets_fields = self.get_selected_fields(objects, count_iterations=False)
+        compiled_fields, compiled_iterative_sets_fields = self.compile_fields(fields, iterative_sets_fields)
+        indexes = {
+            id(field): index
+            for index, field in enumerate(self.get_column_indexes(compiled_fields, compiled_iterative_sets_fields))
+        }
+
+        objects = self.prefetch_iterative_sets(objects, iterative_sets_fields)
+        rows = self.iterate_rows(compiled_fields, compiled_iterative_sets_fields, self.get_chunks(objects))
+
+        while True:
+            batch = [
+                [(indexes[id(field)], value) for field, value in values]
+                for values in itertools.islice(rows, settings.CHUNK_SIZE)
+            ]
+
+            if not batch:
+                break
+
+            pickle.dump(batch, part, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def merge_parts(self, parts):
+        worksheet = self.workbook.add_worksheet(self.get_worksheet_title())
+        objects = self.get_queryset()
+
+        # header is written first, number of iterations is counted for all objects
+        fields, iterative_sets_fields = self.get_selected_fields(objects)
+        self.write_header(worksheet, fields, iterative_sets_fields)
+
+        compiled_fields, compiled_iterative_sets_fields = self.compile_fields(fields, iterative_sets_fields)
+        columns = self.get_column_indexes(compiled_fields, compiled_iterative_sets_fields)
+
+        def iterate_part_rows():
+            for part in parts:
+                while True:
+                    try:
+                        batch = pickle.load(part)
+                    except EOFError:
+                        break
+
+                    for values in batch:
+                        yield [(columns[index], value) for index, value in values]
+
+        row, max_col = self.write_rows(worksheet, iterate_part_rows(), 1, 0)
+
+        worksheet.autofilter(0, 0, row - 1, max_col - 1)
+        worksheet.freeze_panes(1, 0)
+        self.workbook.close()
+
+
+class CsvExporterMixin(ExporterMixin):
+    """
+    Exporter of flat lists into CSV, using the same selectable_fields() contract as ExcelExporterMixin.
+
+    Rows are produced chunk by chunk as encoded bytes, so the output can be streamed by StreamingHttpResponse
+    with bounded memory regardless of the number of rows.
+    """
+    content_type = 'text/csv'
+    export_format = Export.FORMAT_CSV
+    export_context = Export.CONTEXT_LIST
+    proxy_class = None
+    encoding = 'utf-8'
+    dialect = 'excel'
+    supports_parts = True
+
+    @staticmethod
+    def selectable_fields():
+        raise NotImplementedError()
+
+    def __init__(self, **kwargs):
+        self.selected_fields = kwargs.get('selected_fields', None)
+        self.encoding = kwargs.pop('encoding', self.encoding)
+        super().__init__(**kwargs)
+
+    def export(self):
+        for data in self.iterate_output():
+            self.output.write(data)
+
+        # compressed while writing
+        self.is_output_compressed = bool(self.compression)
+
+    def export_to_response(self):
+        # construct response streaming the rows as they are produced
+        response = StreamingHttpResponse(
+            self.iterate_output(),
+            content_type=self.get_output_content_type(),
+        )
+        response['Content-Disposition'] = "attachment; filename={}".format(
+            self.get_output_filename()
+        )
+
+        return response
+
+    def get_attribute(self, field):
+        return field[0]
+
+    def get_label(self, field):
+        return field[1]
+
+    def get_function(self, field):
+        return field[4]
+
+    def compile_field(self, field):
+        try:
+            function = self.get_function(field)
+        except IndexError:
+            function = None
+
+        return ExportField(self.get_attribute(field), function=function)
+
+    def get_selected_fields(self):
+        fields = []
+
+        for field_set in self.selectable_fields().values():
+            for field in field_set:
+                attr = self.get_attribute(field)
+                if self.selected_fields is None or attr in self.selected_fields:
+                    fields.append(field)
+
+        return fields
+
+    def iterate_output(self):
+        """
+        Yield output data, compressed on the fly if compression is set
+        """
+        if self.compression:
+            return compress_chunks(self.iterate_csv(), self.compression, self.get_filename())
+
+        return self.iterate_csv()
+
+    def export_part(self, part):
+        for data in self.iterate_csv(header=False):
+            part.write(data)
+
+    def merge_parts(self, parts):
+        # header is the first data of CSV, rows are not fetched
+        data = self.iterate_csv()
+        self.output.write(next(data))
+        data.close()
+
+        for part in parts:
+            shutil.copyfileobj(part, self.output)
+
+    def iterate_csv(self, header=True):
+        """
+        Yield encoded header and then encoded rows of every chunk of the queryset
+        """
+        encoder = codecs.getincrementalencoder(self.encoding)()
+        buffer = io.StringIO()
+
+        if not header:
+            # byte order mark of the encoding (if any) belongs only to the beginning of the whole output
+            encoder.encode('')
+
+        writer = csv.writer(buffer, dialect=self.dialect)
+
+        def flush():
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return encoder.encode(data)
+
+        with translation.override(self.language):
+            fields = self.get_selected_fields()
+
+            if header:
+                writer.writerow([self.get_label(field) for field in fields])
+                yield flush()
+
+            fields = [self.compile_field(field) for field in fields]
+
+            for chunk in self.get_chunks(self.get_queryset()):
+                writer.writerows(self.get_row_values(obj, fields) for obj in chunk)
+                yield flush()
+                self.report_progress(len(chunk))
+
+    def get_row_values(self, obj, fields):
+        if self.proxy_class:
+            obj.__class__ = self.proxy_class
+
+        return [field.get_value(obj) for field in fields]
+
+    def get_chunks(self, objects):
+        return queryset_chunks(objects, settings.CHUNK_SIZE)
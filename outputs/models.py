@@ -1,7 +1,8 @@
 import inspect
+from functools import lru_cache
 
 from cron_descriptor import CasingTypeEnum, ExpressionDescriptor
-from django.core.exceptions import ValidationError
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.utils.timezone import now
 
 from django.conf import settings
@@ -13,7 +14,6 @@ from django.db import models
 from django.http import QueryDict
 from django.template import Context, Template
 from django.urls import reverse, NoReverseMatch, resolve, Resolver404
-from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _, get_language
 
 if 'auditlog' in settings.INSTALLED_APPS:
@@ -22,6 +22,7 @@ if 'auditlog' in settings.INSTALLED_APPS:
 from outputs import settings as outputs_settings
 from outputs.cron import schedule_export
 from outputs.querysets import ExportQuerySet, SchedulerQuerySet, ExportItemQuerySet
+from outputs.registry import get_exporter_arguments, get_exporter_class, get_exporter_filter, get_exporter_labels, get_selectable_labels
 
 from pragmatic.utils import dispatch_task
 from pragmatic.templatetags.pragmatic_tags import filtered_values
@@ -43,6 +44,21 @@ def get_check_constraint_kwargs(condition):
     return {'check': condition}
 
 
+@lru_cache(maxsize=256)
+def get_cron_description(cron_string, language):
+    """
+    Return human readable description of cron string in language, shared by all schedulers with the same cron string
+    """
+    descriptor = ExpressionDescriptor(
+        expression=cron_string,
+        throw_exception_on_parse_error=False,
+        casing_type=CasingTypeEnum.Sentence,
+        use_24hour_time_format=True,
+        locale_code='%s_%s' % (language, language.upper())
+    )
+    return descriptor.get_description()
+
+
 exporters_module_mapping = outputs_settings.EXPORTERS_MODULE_MAPPING
 
 
@@ -50,10 +66,12 @@ class AbstractExport(models.Model):
     FORMAT_XLSX = 'XLSX'
     FORMAT_XML = 'XML'
     FORMAT_PDF = 'PDF'
+    FORMAT_CSV = 'CSV'
     FORMATS = [
         (FORMAT_XLSX, 'XLSX'),
         (FORMAT_XML, 'XML'),
         (FORMAT_PDF, 'PDF'),
+        (FORMAT_CSV, 'CSV'),
     ]
 
     CONTEXT_LIST = 'LIST'
@@ -88,7 +106,7 @@ class AbstractExport(models.Model):
     @property
     def exporter_class(self):
         try:
-            return import_string(self.exporter_path)
+            return get_exporter_class(self.exporter_path)
         except (ModuleNotFoundError, ImportError) as e:
             raise ImportError(
                 f"Exporter path '{self.exporter_path}' could not be imported: {e}"
@@ -96,11 +114,15 @@ class AbstractExport(models.Model):
 
     @property
     def exporter(self):
-        constructor = self.exporter_class.__init__
-        signature = inspect.signature(constructor)
-        arguments = signature.parameters.keys()
+        return self.get_exporter()
+
+    def get_exporter(self, **params):
+        """
+        Return exporter initialized by exporter_params updated by params
+        """
+        arguments = get_exporter_arguments(self.exporter_class)
 
-        params = self.exporter_params.copy()
+        params = {**self.exporter_params, **params}
 
         for key in list(params.keys()):
             if key not in arguments and 'kwargs' not in arguments:
@@ -133,7 +155,11 @@ class AbstractExport(models.Model):
         result = ''
 
         try:
-            filter = self.exporter.filter
+            filter = get_exporter_filter(self.exporter_class, self.params)
+
+            if filter is None:
+                # exporter without filter class or with customized filter creates its filter by instance
+                filter = self.exporter.filter
             values = filtered_values(filter, self.params)
 
             for param, field in values.items():
@@ -154,35 +180,18 @@ class AbstractExport(models.Model):
         if self.fields is None:  # TODO: double check functionality
             return []
 
-        field_labels = []
         try:
-            exporter = self.exporter
+            labels = get_exporter_labels(self.exporter_class)
+
+            if labels is None:
+                # selectable fields are read from exporter instance
+                labels = get_selectable_labels(self.exporter)
         except (ImportError, ModuleNotFoundError):
             # If the exporter cannot be imported, fall back to returning the raw
             # field names instead of breaking the view.
             return list(self.fields or [])
 
-        try:
-            selectable_fields = exporter.selectable_fields()
-        except AttributeError:
-            selectable_fields = None
-
-        try:
-            for set in exporter.selectable_iterative_sets().values():
-                selectable_fields.update(set)
-        except AttributeError:
-            pass
-
-        selectable_fields_with_labels = {}
-        if selectable_fields:
-            for field_group in selectable_fields.values():
-                for field in field_group:
-                    selectable_fields_with_labels[field[0]] = field[1]
-
-        for field in self.fields:
-            field_labels.append(selectable_fields_with_labels.get(field, field))
-
-        return field_labels
+        return [labels.get(field, field) for field in self.fields]
 
 
 class Export(AbstractExport):
@@ -209,6 +218,16 @@ class Export(AbstractExport):
     total = models.PositiveIntegerField(_('total items'), default=0)
     emails = ArrayField(verbose_name=_('emails'), base_field=models.EmailField(), default=list)
     url = models.URLField(_('export url'), max_length=1024, blank=True)
+    shards_total = models.PositiveIntegerField(_('parts'), default=0,
+                                               help_text=_('Number of shards or checkpoints of the export'))
+    shards_finished = models.PositiveIntegerField(_('finished parts'), default=0,
+                                                  help_text=_('Number of written shards or checkpoints of the export'))
+    processed = models.PositiveIntegerField(_('processed items'), default=0)
+    started = models.DateTimeField(_('started'), blank=True, null=True, default=None)
+    job_id = models.CharField('job ID', max_length=36, blank=True, db_index=True)
+    options = models.JSONField(_('options'), blank=True, default=dict)
+    scheduler = models.ForeignKey('Scheduler', verbose_name=_('scheduler'), on_delete=models.SET_NULL, related_name='exports',
+                                  blank=True, null=True, default=None)
     objects = ExportQuerySet.as_manager()
 
     if 'auditlog' in settings.INSTALLED_APPS:
@@ -276,6 +295,27 @@ class Export(AbstractExport):
 
         return app_label
 
+    def get_progress(self):
+        """
+        Return status, number of processed and total items, percentage and estimated number of seconds to finish
+        """
+        total = self.total
+        is_finished = self.status == self.STATUS_FINISHED
+        processed = total if is_finished else min(self.processed, total)
+        eta = None
+
+        if self.status == self.STATUS_PROCESSING and self.started and 0 < processed < total:
+            elapsed = (now() - self.started).total_seconds()
+            eta = round(elapsed / processed * (total - processed))
+
+        return {
+            'status': self.status,
+            'processed': processed,
+            'total': total,
+            'percent': round(processed * 100 / total, 1) if total else (100 if is_finished else 0),
+            'eta': eta,
+        }
+
     def send_mail(self, language, filename=None):
         from outputs import jobs
 
@@ -288,6 +328,46 @@ class Export(AbstractExport):
             filename,
         )
 
+    def send_shards(self, language, shard_ranges, filename=None):
+        """
+        Dispatch export job of every (first object id, first object id of the next shard or None) range
+        of shard_ranges, the last finished shard dispatches merge of their parts
+        """
+        from outputs import jobs
+
+        self.shards_total = len(shard_ranges)
+        self.shards_finished = 0
+        self.save(update_fields=['shards_total', 'shards_finished'])
+
+        export_class_name = f'{self.__class__.__module__}.{self.__class__.__name__}'
+
+        for shard_index, (first_id, next_id) in enumerate(shard_ranges):
+            dispatch_task(
+                jobs.export_shard_by_id,
+                self.pk,
+                export_class_name,
+                language,
+                shard_index,
+                first_id,
+                next_id,
+                filename,
+            )
+
+    def send_merge(self, language, filename=None):
+        from outputs import jobs
+
+        export_class_name = f'{self.__class__.__module__}.{self.__class__.__name__}'
+        dispatch_task(
+            jobs.merge_export_by_id,
+            self.pk,
+            export_class_name,
+            language,
+            filename,
+        )
+
+    def get_shard_part_path(self, shard_index):
+        return f'exports/parts/{self.pk}/{shard_index}.part'
+
     @property
     def object_list(self):
         """
@@ -324,7 +404,8 @@ class Export(AbstractExport):
             'output_type': self.output_type,
             'recipients': self.recipients.all(),
             'selected_fields': self.fields,
-            'language': self.get_language()
+            'language': self.get_language(),
+            **self.options
         }
 
     def update_export_items_result(self, result, detail=''):
@@ -399,6 +480,32 @@ class ExportItem(models.Model):
         return '{} #{} {} ({})'.format(_('Export item'), self.pk, name, self.result)
 
 
+class CachedOutput(models.Model):
+    """
+    Output of an export stored in the default storage, reused by identical exports (see outputs.usecases.get_output_cache_key())
+    """
+    key = models.CharField(_('key'), max_length=64, unique=True)
+    path = models.CharField(_('path'), max_length=255)
+    size = models.PositiveBigIntegerField(_('size'))
+    created = models.DateTimeField(_('created'), auto_now_add=True)
+    used = models.DateTimeField(_('used'), default=now, db_index=True)
+
+    class Meta:
+        verbose_name = _('cached output')
+        verbose_name_plural = _('cached outputs')
+        ordering = ('used',)
+        default_permissions = getattr(settings, 'DEFAULT_PERMISSIONS', ('add', 'change', 'delete', 'view'))
+
+    def __str__(self):
+        return '{} {}'.format(_('Cached output'), self.key)
+
+    def delete(self, *args, **kwargs):
+        from django.core.files.storage import default_storage
+
+        default_storage.delete(self.path)
+        return super().delete(*args, **kwargs)
+
+
 class Scheduler(AbstractExport):
     ROUTINE_OFTEN = 'OFTEN'                 # for debug purposes
     ROUTINE_DAILY = 'DAILY'                 # every morning at 8:00
@@ -424,9 +531,10 @@ class Scheduler(AbstractExport):
     routine = models.CharField(_('routine'), choices=ROUTINES, max_length=7)
     cron_string = models.CharField(_('cron string'), max_length=32, blank=True)
     is_active = models.BooleanField(_('active'), default=True)
-    executions = ArrayField(verbose_name=_('executions'), base_field=models.DateTimeField(), blank=True, default=list)
     job_id = models.CharField('job ID', max_length=36, blank=True)
     language = models.CharField(_('language'), choices=settings.LANGUAGES, max_length=2, db_index=True, default='en')
+    is_incremental = models.BooleanField(_('incremental'), default=False)
+    incremental_field = models.CharField(_('incremental field'), max_length=40, blank=True)
     # TODO: filename
     objects = SchedulerQuerySet.as_manager()
 
@@ -468,13 +576,86 @@ class Scheduler(AbstractExport):
             except Exception as e:
                 raise ValidationError(_('Invalid cron string: %s') % str(e))
 
+        if self.is_incremental:
+            if self.incremental_field == '':
+                raise ValidationError(_('Missing incremental field'))
+
+            model = self.content_type.model_class() if self.content_type_id else None
+
+            if model is not None:
+                try:
+                    field = model._meta.get_field(self.incremental_field)
+                except FieldDoesNotExist:
+                    raise ValidationError(_('Unknown incremental field %s') % self.incremental_field)
+
+                # DateTimeField is subclass of DateField
+                if not isinstance(field, models.DateField):
+                    raise ValidationError(_('Incremental field %s is not a date field') % self.incremental_field)
+
+            # changed objects are passed to the exporter as its queryset
+            try:
+                customizes_queryset = getattr(self.exporter_class, 'customizes_queryset', None)
+            except ImportError as e:
+                raise ValidationError(str(e))
+
+            if customizes_queryset is None or customizes_queryset():
+                raise ValidationError(_('Exporter selects its objects by itself, it can not export them incrementally'))
+
         return super().clean()
 
     def get_absolute_url(self):
         return reverse('outputs:scheduler_detail', args=(self.pk,))
 
+    def add_execution(self):
+        """
+        Record execution of the scheduler and delete executions over SCHEDULER_EXECUTIONS_RETENTION
+        """
+        execution = self.executions.create()
+        retention = outputs_settings.SCHEDULER_EXECUTIONS_RETENTION
+
+        if retention:
+            oldest_kept = self.executions.order_by('-created').values_list('created', flat=True)[retention - 1:retention]
+
+            if oldest_kept:
+                self.executions.filter(created__lt=oldest_kept[0]).delete()
+
+        return execution
+
+    def get_last_successful_execution(self):
+        """
+        Return creation time of the last finished export of the scheduler or None
+        """
+        return self.exports\
+            .filter(status=Export.STATUS_FINISHED)\
+            .order_by('-created')\
+            .values_list('created', flat=True)\
+            .first()
+
+    def get_incremental_queryset(self):
+        """
+        Return queryset of objects with incremental field greater than the last successful execution,
+        None if the scheduler is not incremental or all objects have to be exported
+        """
+        if not self.is_incremental:
+            return None
+
+        last_execution = self.get_last_successful_execution()
+
+        if last_execution is None:
+            return None
+
+        queryset = getattr(self.exporter_class, 'queryset', None)
+
+        if queryset is None:
+            queryset = self.model_class._default_manager.all()
+
+        return queryset.filter(**{f'{self.incremental_field}__gt': last_execution})
+
     @property
     def job(self):
+        if hasattr(self, '_prefetched_job'):
+            return self._prefetched_job
+
         if self.job_id in EMPTY_VALUES:
             return None
 
@@ -491,24 +672,75 @@ class Scheduler(AbstractExport):
 
     @property
     def schedule_time(self):
-        if not self.is_scheduled:
+        if hasattr(self, '_prefetched_schedule_time'):
+            return self._prefetched_schedule_time
+
+        if self.job_id in EMPTY_VALUES:
             return None
 
+        return self.get_schedule_times([self.job_id]).get(self.job_id)
+
+    @classmethod
+    def get_schedule_times(cls, job_ids):
+        """
+        Return map of cron job IDs to their next execution time in project's TIME_ZONE,
+        read by one pipelined Redis round trip. Jobs which are not scheduled are missing.
+        """
+        job_ids = [job_id for job_id in job_ids if job_id not in EMPTY_VALUES]
+
+        if not job_ids:
+            return {}
+
         import django_rq
         from pytz import timezone
+        from rq_scheduler.utils import from_unix
 
-        # get all scheduled jobs
+        # score of the job in sorted set of scheduled jobs is its execution time
         scheduler = django_rq.get_scheduler('cron')
-        jobs = scheduler.get_jobs(with_times=True)
+        pipeline = scheduler.connection.pipeline(transaction=False)
 
-        # get scheduler job by its ID
-        # job, scheduled_at = list(filter(lambda x: x[0].id == self.job_id, jobs))[0]  # this is slower because it iterates whole array
-        job, scheduled_at = next(x for x in jobs if x[0].id == self.job_id)            # returns first match
+        for job_id in job_ids:
+            pipeline.zscore(scheduler.scheduled_jobs_key, job_id)
 
-        # read time from scheduler
-        scheduled_at = scheduled_at.replace(tzinfo=timezone('UTC'))
-        scheduled_at = scheduled_at.astimezone(timezone(settings.TIME_ZONE))
-        return scheduled_at
+        schedule_times = {}
+
+        for job_id, score in zip(job_ids, pipeline.execute()):
+            if score is not None:
+                # read time from scheduler
+                scheduled_at = from_unix(score).replace(tzinfo=timezone('UTC'))
+                schedule_times[job_id] = scheduled_at.astimezone(timezone(settings.TIME_ZONE))
+
+        return schedule_times
+
+    @classmethod
+    def prefetch_schedules(cls, schedulers):
+        """
+        Resolve cron jobs and next execution times of schedulers (for instance a page of a list)
+        by two pipelined Redis round trips and attach them to the instances,
+        so their job, is_scheduled and schedule_time don't query Redis anymore
+        """
+        schedulers = list(schedulers)
+        job_ids = [scheduler.job_id for scheduler in schedulers if scheduler.job_id not in EMPTY_VALUES]
+        jobs = {}
+
+        if job_ids:
+            import django_rq
+            from rq.job import Job
+
+            queue = django_rq.get_queue('cron')
+            jobs = dict(zip(job_ids, Job.fetch_many(job_ids, connection=queue.connection)))
+
+        schedule_times = cls.get_schedule_times(job_ids)
+
+        for scheduler in schedulers:
+            scheduler._prefetched_job = jobs.get(scheduler.job_id)
+            scheduler._prefetched_schedule_time = schedule_times.get(scheduler.job_id)
+
+        return schedulers
+
+    def clear_prefetched_schedule(self):
+        self.__dict__.pop('_prefetched_job', None)
+        self.__dict__.pop('_prefetched_schedule_time', None)
 
     @property
     def is_scheduled(self):
@@ -520,20 +752,14 @@ class Scheduler(AbstractExport):
 
     @property
     def cron_description(self):
-        language = get_language()
-
-        descriptor = ExpressionDescriptor(
-            expression=self.get_cron_string(),
-            throw_exception_on_parse_error=False,
-            casing_type=CasingTypeEnum.Sentence,
-            use_24hour_time_format=True,
-            locale_code='%s_%s' % (language, language.upper())
-        )
-        return descriptor.get_description()
+        return get_cron_description(self.get_cron_string(), get_language())
 
     def cancel_schedule(self):
-        if self.is_scheduled:
-            self.job.delete()
+        job = self.job
+
+        if job is not None:
+            job.delete()
+            self.clear_prefetched_schedule()
 
     def schedule(self):
         # cancel previous cron job
@@ -563,6 +789,8 @@ class Scheduler(AbstractExport):
             # inactive scheduler doesn't have job ID
             self.job_id = ''
 
+        self.clear_prefetched_schedule()
+
         self.save(update_fields=['job_id'])
 
     def get_cron_string(self):
@@ -596,9 +824,40 @@ class Scheduler(AbstractExport):
         raise NotImplementedError()
 
 
+class SchedulerExecution(models.Model):
+    scheduler = models.ForeignKey(Scheduler, verbose_name=_('scheduler'), on_delete=models.CASCADE, related_name='executions')
+    export = models.ForeignKey(Export, verbose_name=_('export'), on_delete=models.SET_NULL, related_name='scheduler_executions',
+                               blank=True, null=True, default=None)
+    status = models.CharField(_('status'), choices=Export.STATUSES, max_length=10, blank=True, default=Export.STATUS_PENDING)
+    total = models.PositiveIntegerField(_('total items'), default=0)
+    created = models.DateTimeField(_('created'), default=now)
+    started = models.DateTimeField(_('started'), blank=True, null=True, default=None)
+    finished = models.DateTimeField(_('finished'), blank=True, null=True, default=None)
+
+    class Meta:
+        verbose_name = _('scheduler execution')
+        verbose_name_plural = _('scheduler executions')
+        ordering = ('-created',)
+        default_permissions = getattr(settings, 'DEFAULT_PERMISSIONS', ('add', 'change', 'delete', 'view'))
+        indexes = [
+            models.Index(fields=['scheduler', 'created']),
+        ]
+
+    def __str__(self):
+        return '{} #{} ({})'.format(_('Scheduler execution'), self.pk, self.get_status_display())
+
+    @property
+    def duration(self):
+        # time spent by the export job, without waiting in the queue
+        if self.started is None or self.finished is None:
+            return None
+
+        return self.finished - self.started
+
+
 if 'auditlog' in settings.INSTALLED_APPS:
     from auditlog.registry import auditlog
     auditlog.register(Export, exclude_fields=['modified', 'creator'])
-    auditlog.register(Scheduler, exclude_fields=['modified', 'creator', 'executions', 'job_id'])
+    auditlog.register(Scheduler, exclude_fields=['modified', 'creator', 'job_id'])
 
 from .signals import *
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.timezone import now
 
 
 class ExportQuerySet(models.QuerySet):
@@ -17,6 +18,32 @@ class ExportItemQuerySet(models.QuerySet):
     def by_export_id(self, export_id):
         return self.filter(export__id=export_id)
 
+    def insert_from_queryset(self, export, content_type, queryset):
+        """
+        Insert item of the export for every object of the queryset by a single INSERT ... SELECT statement
+        and return number of inserted rows. Objects are not fetched, so their detail stays empty.
+        """
+        from django.db import connections
+
+        object_ids = queryset.order_by().values(export_item_object_id=models.F('pk'))
+        select_sql, select_params = object_ids.query.sql_with_params()
+
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        columns = ', '.join(quote_name(column) for column in (
+            self.model._meta.get_field(name).column
+            for name in ['export', 'content_type', 'object_id', 'result', 'detail', 'created', 'modified']
+        ))
+        created = now()
+
+        sql = f'INSERT INTO {quote_name(self.model._meta.db_table)} ({columns}) ' \
+              f'SELECT %s, %s, {quote_name("export_item_object_id")}, %s, %s, %s, %s FROM ({select_sql}) AS {quote_name("objects")}'
+        params = (export.pk, content_type.pk, '', '', created, created) + tuple(select_params)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
 class SchedulerQuerySet(models.QuerySet):
     def active(self):
         return self.filter(is_active=True)
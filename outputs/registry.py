@@ -0,0 +1,96 @@
+"""
+Process-wide registry of exporter classes resolved from exporter paths of exports and schedulers.
+
+Exporter class, arguments of its constructor and labels of its selectable fields are resolved
+once per process, so exports and schedulers are displayed without instantiating their exporters.
+"""
+import inspect
+from functools import lru_cache
+
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language
+
+
+@lru_cache(maxsize=None)
+def get_exporter_class(exporter_path):
+    return import_string(exporter_path)
+
+
+@lru_cache(maxsize=None)
+def get_exporter_arguments(exporter_class):
+    """
+    Return names of arguments of exporter constructor
+    """
+    return frozenset(inspect.signature(exporter_class.__init__).parameters.keys())
+
+
+def get_selectable_labels(exporter):
+    """
+    Return map of selectable field names to their labels of exporter class or instance
+    """
+    try:
+        selectable_fields = dict(exporter.selectable_fields())
+    except AttributeError:
+        selectable_fields = None
+
+    try:
+        for set in exporter.selectable_iterative_sets().values():
+            selectable_fields.update(set)
+    except AttributeError:
+        pass
+
+    labels = {}
+
+    if selectable_fields:
+        for field_group in selectable_fields.values():
+            for field in field_group:
+                labels[field[0]] = field[1]
+
+    return labels
+
+
+@lru_cache(maxsize=None)
+def _get_exporter_labels(exporter_class, language):
+    return get_selectable_labels(exporter_class)
+
+
+def get_exporter_labels(exporter_class):
+    """
+    Return cached map of selectable field names to their labels in current language,
+    None if selectable fields can be read only from exporter instance
+    """
+    try:
+        return _get_exporter_labels(exporter_class, get_language())
+    except TypeError:
+        # selectable_fields() is instance method
+        return None
+
+
+def get_exporter_filter(exporter_class, params):
+    """
+    Return filter of exporter class bound to params for displaying filtered values,
+    None if exporter doesn't define filter_class or its filter has to be created by exporter instance
+    """
+    from outputs.mixins import FilterExporterMixin
+
+    filter_class = getattr(exporter_class, 'filter_class', None)
+
+    if filter_class is None:
+        return None
+
+    # overridden methods may create the filter with other arguments (user, request, ...)
+    for method in ['get_filter', 'get_whole_queryset']:
+        if getattr(exporter_class, method, None) is not getattr(FilterExporterMixin, method):
+            return None
+
+    # queryset of filter is not evaluated, only its form is used
+    return filter_class(params, queryset=exporter_class.get_model()._default_manager.none())
+
+
+def clear_cache():
+    """
+    Clear resolved exporter classes and their metadata, for instance after reloading exporter modules
+    """
+    get_exporter_class.cache_clear()
+    get_exporter_arguments.cache_clear()
+    _get_exporter_labels.cache_clear()
@@ -5,4 +5,15 @@ EXPORTERS_MODULE_MAPPING = getattr(settings, 'OUTPUTS_EXPORTERS_MODULE_MAPPING',
 MIGRATION_DEPENDENCIES = getattr(settings, 'OUTPUTS_MIGRATION_DEPENDENCIES', [])
 RELATED_MODELS = getattr(settings, 'OUTPUTS_RELATED_MODELS', [])
 NUMBER_OF_THREADS = getattr(settings, 'OUTPUTS_NUMBER_OF_THREADS', 4)
+NUMBER_OF_PROCESSES = getattr(settings, 'OUTPUTS_NUMBER_OF_PROCESSES', None)
+CHUNK_SIZE = getattr(settings, 'OUTPUTS_CHUNK_SIZE', 1000)
+SPOOL_MAX_SIZE = getattr(settings, 'OUTPUTS_SPOOL_MAX_SIZE', 10 * 1024 * 1024)
 SAVE_AS_FILE = getattr(settings, 'OUTPUTS_SAVE_AS_FILE', False)
+COMPRESSION = getattr(settings, 'OUTPUTS_COMPRESSION', None)
+OUTPUT_CACHE_TTL = getattr(settings, 'OUTPUTS_OUTPUT_CACHE_TTL', None)
+OUTPUT_CACHE_MAX_SIZE = getattr(settings, 'OUTPUTS_OUTPUT_CACHE_MAX_SIZE', 100 * 1024 * 1024)
+OUTPUT_CACHE_VERSION = getattr(settings, 'OUTPUTS_OUTPUT_CACHE_VERSION', None)
+SHARD_SIZE = getattr(settings, 'OUTPUTS_SHARD_SIZE', None)
+CHECKPOINT_SIZE = getattr(settings, 'OUTPUTS_CHECKPOINT_SIZE', None)
+PROGRESS_INTERVAL = getattr(settings, 'OUTPUTS_PROGRESS_INTERVAL', 1)
+SCHEDULER_EXECUTIONS_RETENTION = getattr(settings, 'OUTPUTS_SCHEDULER_EXECUTIONS_RETENTION', 100)
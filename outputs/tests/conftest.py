@@ -60,7 +60,16 @@ def mock_import_string(path):
 
 # Patch import_string globally for tests
 patch('django.utils.module_loading.import_string', side_effect=mock_import_string).start()
-patch('outputs.models.import_string', side_effect=mock_import_string).start()
+patch('outputs.registry.import_string', side_effect=mock_import_string).start()
+
+
+@pytest.fixture(autouse=True)
+def clear_exporter_registry():
+    """Exporter classes resolved by one test must not leak into another."""
+    from outputs import registry
+    registry.clear_cache()
+    yield
+    registry.clear_cache()
 
 
 @pytest.fixture(autouse=True)
@@ -209,6 +218,16 @@ class MockExporter:
     def get_output(self):
         return b'test export content'
 
+    def get_output_file(self):
+        import io
+        return io.BytesIO(self.get_output())
+
+    def get_output_filename(self, filename=None):
+        return filename or self.get_filename()
+
+    def get_output_content_type(self):
+        return self.content_type
+
     def get_message_body(self, count, file_url=None):
         return f'Export contains {count} items'
 
@@ -270,6 +289,8 @@ def mock_rq_queue(monkeypatch):
     def get_scheduler(name='default'):
         scheduler = Mock()
         scheduler.get_jobs.return_value = []
+        scheduler.connection = fake_redis
+        scheduler.scheduled_jobs_key = 'rq:scheduler:scheduled_jobs'
         scheduler.cron.return_value = mock_cron_job
         return scheduler
 
@@ -292,6 +313,11 @@ def mock_rq_queue(monkeypatch):
 
     monkeypatch.setattr(Job, 'fetch', classmethod(fake_job_fetch))
 
+    def fake_job_fetch_many(cls, job_ids, connection=None, serializer=None):
+        return [fake_job_fetch(cls, job_id, connection) for job_id in job_ids]
+
+    monkeypatch.setattr(Job, 'fetch_many', classmethod(fake_job_fetch_many))
+
     return {'queue': get_queue(), 'scheduler': get_scheduler(), 'cron_job': mock_cron_job}
 
 
@@ -315,13 +341,10 @@ def create_test_model_table(db):
     from django.contrib.contenttypes.models import ContentType
     from outputs.tests.models import SampleModel
     
-    # Create the table if it doesn't exist
-    with connection.schema_editor() as schema_editor:
-        try:
+    # Create the table if it doesn't exist (transactional tests commit it)
+    if SampleModel._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as schema_editor:
             schema_editor.create_model(SampleModel)
-        except Exception:
-            # Table might already exist, ignore
-            pass
 
     # Ensure ContentType exists for SampleModel
     ContentType.objects.get_for_model(SampleModel)
@@ -0,0 +1,203 @@
+"""
+Benchmarks of the export pipeline.
+
+Skipped by default, run them with:
+
+    OUTPUTS_BENCHMARKS=1 pytest outputs/tests/test_benchmarks.py -s
+"""
+import datetime
+import operator
+import os
+import time
+
+import pytest
+from unittest.mock import patch
+
+from django.utils import translation
+from django.utils.timezone import localtime
+
+from outputs import settings as outputs_settings
+from outputs.mixins import ExcelExporterMixin
+from outputs.tests.models import SampleModel
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get('OUTPUTS_BENCHMARKS'),
+    reason='set OUTPUTS_BENCHMARKS=1 to run benchmarks'
+)
+
+BENCHMARK_ROWS = int(os.environ.get('OUTPUTS_BENCHMARK_ROWS', 20000))
+
+
+class BenchmarkExcelExporter(ExcelExporterMixin):
+    def get_queryset(self):
+        return SampleModel.objects.order_by('pk')
+
+    def get_worksheet_title(self, index=0):
+        return 'Benchmark'
+
+    @staticmethod
+    def selectable_fields():
+        return {
+            'Sample': [
+                ('id', 'ID', 5, 'integer'),
+                ('name', 'Name', 20),
+                ('email', 'Email', 30),
+                ('created', 'Created', 15, 'datetime'),
+                ('is_active', 'Active', 8, None, lambda value: 'Yes' if value else 'No'),
+                ('name', 'Name length', 8, 'integer', lambda value, obj: len(value) + len(obj.email)),
+            ]
+        }
+
+
+def create_benchmark_objects(count):
+    SampleModel.objects.bulk_create(
+        [SampleModel(name=f'Sample {i}', email=f'sample{i}@example.com') for i in range(count)],
+        batch_size=5000
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_excel_pipeline_workers():
+    """Throughput of the fetch/format/write pipeline at 1, 2, 4 and 8 workers."""
+    create_benchmark_objects(BENCHMARK_ROWS)
+
+    print(f'\nExcel export of {BENCHMARK_ROWS} rows')
+
+    for workers in (1, 2, 4, 8):
+        exporter = BenchmarkExcelExporter(user=None, recipients=[])
+
+        with patch.object(outputs_settings, 'NUMBER_OF_THREADS', workers):
+            start = time.perf_counter()
+            exporter.export()
+            elapsed = time.perf_counter() - start
+
+        print(f'{workers} workers: {elapsed:.2f}s, {BENCHMARK_ROWS / elapsed:,.0f} rows/s')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_excel_pipeline_processes():
+    """Throughput of the pipeline formatting chunks by 2, 4 and 8 worker processes compared to threads."""
+    create_benchmark_objects(BENCHMARK_ROWS)
+
+    print(f'\nExcel export of {BENCHMARK_ROWS} rows')
+
+    for processes in (None, 2, 4, 8):
+        exporter = BenchmarkExcelExporter(user=None, recipients=[], processes=processes)
+
+        start = time.perf_counter()
+        exporter.export()
+        elapsed = time.perf_counter() - start
+
+        label = f'{processes} processes' if processes else f'{outputs_settings.NUMBER_OF_THREADS} threads'
+        print(f'{label}: {elapsed:.2f}s, {BENCHMARK_ROWS / elapsed:,.0f} rows/s')
+
+
+def benchmark_fields(columns):
+    formats = (None, 'bold', 'integer', 'money', 'date')
+    fields = []
+
+    for index in range(columns):
+        cell_format = formats[index % len(formats)]
+
+        if cell_format == 'date':
+            fields.append(('created', f'Created {index}', 15, cell_format))
+        elif cell_format in ('integer', 'money'):
+            fields.append(('pk', f'ID {index}', 8, cell_format, lambda value, obj: value * 2))
+        elif index % 2:
+            fields.append(('name', f'Name {index}', 20, cell_format, lambda value: value.upper()))
+        else:
+            fields.append(('email', f'Email {index}', 30, cell_format))
+
+    return fields
+
+
+def write_baseline_cell(exporter, worksheet, row, col, obj, field):
+    """
+    Cell writer of the exporter before fields were compiled, resolving the field definition for every cell
+    """
+    translation.activate(exporter.language)
+
+    attr_index = None
+    attr = exporter.get_attribute(field)
+
+    if '[' in attr and ']' in attr:
+        start = attr.rindex('[')
+        end = attr.rindex(']')
+        attr_index = attr[start+1:end]
+        attr = attr[0:start]
+
+    cell_format_identifier = exporter.get_cell_format(field)
+    cell_format = exporter.formats.get(cell_format_identifier, None)
+
+    try:
+        if isinstance(obj, dict):
+            value = obj.get(attr)
+        else:
+            value = operator.attrgetter(attr)(obj)
+    except AttributeError as e:
+        if 'NoneType' in str(e):
+            value = None
+        else:
+            raise e
+
+    if attr_index and value is not None:
+        value = value.get(attr_index, '')
+
+    try:
+        func = exporter.get_function(field)
+        value = func(value, obj)
+    except TypeError:
+        value = func(value)
+    except IndexError:
+        pass
+
+    if isinstance(value, tuple) and isinstance(value[0], str):
+        formula, value = value
+        worksheet.write_formula(row, col, formula, cell_format, value)
+    else:
+        if isinstance(value, datetime.datetime):
+            value = localtime(value)
+
+        if cell_format_identifier and 'date' in cell_format_identifier and value:
+            worksheet.write_datetime(row, col, value, cell_format)
+        else:
+            try:
+                worksheet.write(row, col, value, cell_format)
+            except TypeError:
+                worksheet.write(row, col, str(value), cell_format)
+
+
+def test_benchmark_excel_row_40_columns():
+    """Per-row cost of a 40 column export, compiled fields vs. the baseline resolving field definitions for every cell."""
+    from django.utils import timezone
+
+    rows = int(os.environ.get('OUTPUTS_BENCHMARK_ROWS', 20000)) // 4
+    columns = 40
+    fields = benchmark_fields(columns)
+    objects = [
+        SampleModel(pk=i, name=f'Sample {i}', email=f'sample{i}@example.com', created=timezone.now())
+        for i in range(rows)
+    ]
+
+    exporter = BenchmarkExcelExporter(user=None, recipients=[], constant_memory=True)
+    worksheet = exporter.workbook.add_worksheet('compiled')
+    compiled_fields, compiled_iterative_sets_fields = exporter.compile_fields(fields, [])
+
+    start = time.perf_counter()
+    rows_values = (exporter.get_row_values(obj, compiled_fields, compiled_iterative_sets_fields) for obj in objects)
+    exporter.write_rows(worksheet, rows_values, 1, 0)
+    compiled = (time.perf_counter() - start) / rows
+
+    worksheet = exporter.workbook.add_worksheet('baseline')
+
+    start = time.perf_counter()
+    for row, obj in enumerate(objects, start=1):
+        for col, field in enumerate(fields):
+            write_baseline_cell(exporter, worksheet, row, col, obj, field)
+    per_cell = (time.perf_counter() - start) / rows
+
+    exporter.workbook.close()
+
+    print(f'\nExcel row of {columns} columns, {rows} rows')
+    print(f'compiled fields: {compiled * 1e6:,.1f} us/row')
+    print(f'baseline per cell: {per_cell * 1e6:,.1f} us/row')
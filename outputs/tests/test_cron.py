@@ -59,15 +59,41 @@ class TestScheduleExport:
         assert call_kwargs.get('language') == scheduler.language
 
     def test_schedule_export_updates_executions(self, scheduler, mock_rq_queue):
-        """Executions list is appended to after dispatching."""
-        initial_count = len(scheduler.executions)
+        """Execution is recorded and passed to the export job."""
+        initial_count = scheduler.executions.count()
 
         with patch('outputs.cron.import_string') as mock_import, \
-             patch('outputs.cron.dispatch_task'), \
+             patch('outputs.cron.dispatch_task') as mock_dispatch, \
              patch('outputs.cron.serialize_exporter_params', return_value={}):
             mock_import.return_value = Scheduler
 
             schedule_export(scheduler.pk, 'outputs.models.Scheduler')
 
-        scheduler.refresh_from_db()
-        assert len(scheduler.executions) == initial_count + 1
+        assert scheduler.executions.count() == initial_count + 1
+        execution = scheduler.executions.get()
+        assert execution.status == 'PENDING'
+        assert mock_dispatch.call_args[1]['execution_id'] == execution.pk
+
+    def test_schedule_export_incremental(self, scheduler, content_type, mock_rq_queue):
+        """Incremental scheduler exports objects changed since its last finished export."""
+        from outputs.models import Export
+        from outputs.tests.models import SampleModel
+
+        scheduler.is_incremental = True
+        scheduler.incremental_field = 'created'
+        scheduler.save()
+        Export.objects.create(
+            content_type=content_type, format=Export.FORMAT_XLSX, context=Export.CONTEXT_LIST,
+            status=Export.STATUS_FINISHED, scheduler=scheduler
+        )
+        new = SampleModel.objects.create(name='new', email='new@example.com')
+
+        with patch('outputs.cron.import_string') as mock_import, \
+             patch('outputs.cron.dispatch_task') as mock_dispatch, \
+             patch('outputs.cron.serialize_exporter_params', return_value={}) as mock_serialize:
+            mock_import.return_value = Scheduler
+
+            schedule_export(scheduler.pk, 'outputs.models.Scheduler')
+
+        assert list(mock_serialize.call_args[0][0]['queryset']) == [new]
+        assert mock_dispatch.call_args[1]['scheduler_id'] == scheduler.pk
@@ -0,0 +1,122 @@
+"""
+Tests for compiled export fields.
+"""
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import Mock
+
+from django.utils import timezone
+
+from outputs.fields import ExcelField, ExportField, get_function_arity
+from outputs.tests.models import SampleModel
+
+
+class TestGetFunctionArity:
+    """Tests for get_function_arity."""
+
+    def test_one_argument(self):
+        assert get_function_arity(lambda value: value) == 1
+
+    def test_two_arguments(self):
+        assert get_function_arity(lambda value, obj: value) == 2
+
+    def test_var_positional(self):
+        assert get_function_arity(lambda *args: args) == 2
+
+    def test_keyword_only(self):
+        assert get_function_arity(lambda value, *, obj=None: value) == 1
+
+    def test_builtin_without_signature(self):
+        assert get_function_arity(max) is None
+
+
+class TestExportField:
+    """Tests for ExportField."""
+
+    def test_get_value_attribute(self):
+        field = ExportField('name')
+        assert field.get_value(SampleModel(name='Test')) == 'Test'
+
+    def test_get_value_nested_none(self):
+        field = ExportField('name.missing')
+        assert field.get_value(SimpleNamespace(name=None)) is None
+
+    def test_get_value_missing_attribute_raises(self):
+        field = ExportField('missing')
+        with pytest.raises(AttributeError):
+            field.get_value(SampleModel(name='Test'))
+
+    def test_get_value_dict(self):
+        field = ExportField('name')
+        assert field.get_value({'name': 'Test'}) == 'Test'
+
+    def test_get_value_index(self):
+        field = ExportField('metadata[color]')
+        assert field.attribute == 'metadata'
+        assert field.index == 'color'
+        assert field.get_value({'metadata': {'color': 'red'}}) == 'red'
+        assert field.get_value({'metadata': {}}) == ''
+        assert field.get_value({'metadata': None}) is None
+
+    def test_get_value_function(self):
+        obj = SampleModel(name='Test', email='test@example.com')
+        assert ExportField('name', lambda value: value.upper()).get_value(obj) == 'TEST'
+        assert ExportField('name', lambda value, obj: obj.email).get_value(obj) == 'test@example.com'
+
+    def test_get_value_function_probed(self):
+        obj = SampleModel(name='Test')
+        assert ExportField('name', len).get_value(obj) == 4
+
+    def test_get_value_function_type_error_not_swallowed(self):
+        def broken(value, obj):
+            raise TypeError('broken')
+
+        with pytest.raises(TypeError, match='broken'):
+            ExportField('name', broken).get_value(SampleModel(name='Test'))
+
+    def test_get_value_localtime(self):
+        value = datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)
+        result = ExportField('created').get_value({'created': value})
+        assert result == value
+        assert result.tzinfo == timezone.localtime(value).tzinfo
+
+
+class TestExcelField:
+    """Tests for ExcelField."""
+
+    def test_write_value(self):
+        worksheet = Mock()
+        cell_format = Mock()
+        field = ExcelField('name', cell_format=cell_format)
+        field.write(worksheet, 1, 2, 'Test')
+        worksheet.write.assert_called_once_with(1, 2, 'Test', cell_format)
+
+    def test_write_value_forces_string(self):
+        worksheet = Mock()
+        worksheet.write.side_effect = [TypeError(), None]
+        field = ExcelField('name')
+        field.write(worksheet, 1, 2, ['a'])
+        worksheet.write.assert_called_with(1, 2, "['a']", None)
+
+    def test_write_formula(self):
+        worksheet = Mock()
+        field = ExcelField('name')
+        field.write(worksheet, 1, 2, ('=A1+B1', 3))
+        worksheet.write_formula.assert_called_once_with(1, 2, '=A1+B1', None, 3)
+
+    def test_write_date(self):
+        worksheet = Mock()
+        cell_format = Mock()
+        field = ExcelField('created', cell_format=cell_format, is_date=True)
+        value = datetime.date(2024, 1, 1)
+        field.write(worksheet, 1, 2, value)
+        worksheet.write_datetime.assert_called_once_with(1, 2, value, cell_format)
+
+    def test_write_date_empty(self):
+        worksheet = Mock()
+        field = ExcelField('created', is_date=True)
+        field.write(worksheet, 1, 2, None)
+        worksheet.write_datetime.assert_not_called()
+        worksheet.write.assert_called_once_with(1, 2, None, None)
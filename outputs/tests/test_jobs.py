@@ -35,18 +35,29 @@ class TestSerializeDeserializeExporterParams:
         assert 'recipients' not in result
         assert set(result['recipient_ids']) == {user.pk, other_user.pk}
 
-    def test_serialize_with_queryset_adds_ids_and_model(self, user):
-        SampleModel.objects.create(name='A', email='a@example.com')
-        SampleModel.objects.create(name='B', email='b@example.com')
+    def test_serialize_recipients_queryset(self, user, other_user, django_assert_num_queries):
+        from django.contrib.auth import get_user_model
+        recipients = get_user_model().objects.filter(pk__in=[user.pk, other_user.pk])
+
+        with django_assert_num_queries(1):
+            result = serialize_exporter_params({'user': user, 'recipients': recipients})
+
+        assert set(result['recipient_ids']) == {user.pk, other_user.pk}
+
+    def test_serialize_with_queryset_adds_query_and_model(self, user, django_assert_num_queries):
+        for i in range(50):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
         qs = SampleModel.objects.all()
 
         params = {'user': user, 'recipients': [], 'queryset': qs}
-        result = serialize_exporter_params(params)
+
+        # queryset is not evaluated
+        with django_assert_num_queries(0):
+            result = serialize_exporter_params(params)
 
         assert 'queryset' not in result
-        assert 'queryset_ids' in result
-        assert 'queryset_model' in result
-        assert set(result['queryset_ids']) == set(qs.values_list('pk', flat=True))
+        assert 'queryset_ids' not in result
+        assert isinstance(result['queryset_query'], str)
         assert result['queryset_model'] == 'outputs.samplemodel'
 
     def test_serialize_without_queryset_omits_keys(self, user):
@@ -84,7 +95,19 @@ class TestSerializeDeserializeExporterParams:
         assert 'queryset' in deserialized
         assert set(deserialized['queryset'].values_list('pk', flat=True)) == {obj_a.pk, obj_b.pk}
 
+    def test_deserialize_round_trip_keeps_filters_and_ordering(self, user):
+        for name in ['B', 'C', 'A', 'D']:
+            SampleModel.objects.create(name=name, email=f'{name}@example.com', is_active=name != 'D')
+        qs = SampleModel.objects.filter(is_active=True).order_by('-name')
+
+        serialized = serialize_exporter_params({'user': user, 'recipients': [], 'queryset': qs})
+        deserialized = deserialize_exporter_params(serialized)
+
+        assert deserialized['queryset'].model is SampleModel
+        assert list(deserialized['queryset'].values_list('name', flat=True)) == ['C', 'B', 'A']
+
     def test_deserialize_preserves_queryset_order(self, user):
+        """Payloads with ids queued by older versions are still deserialized."""
         obj_a = SampleModel.objects.create(name='A', email='a@example.com')
         obj_b = SampleModel.objects.create(name='B', email='b@example.com')
         serialized = {
@@ -135,6 +158,7 @@ class TestExecuteExport:
         mock_export.id = 1
         mock_export.total = 5
         mock_exporter = MagicMock()
+        mock_exporter.shard_size = None
         mock_exporter.save_export.return_value = mock_export
 
         mock_exporter_class = MagicMock(return_value=mock_exporter)
@@ -158,22 +182,74 @@ class TestExecuteExport:
         with pytest.raises(RuntimeError, match="boom"):
             execute_export(mock_exporter_class, serialized, 'en')
 
+    def test_execute_export_records_scheduler_execution(self, user, export, scheduler):
+        """Export is linked to the execution of its scheduler, failed job marks the execution failed."""
+        execution = scheduler.add_execution()
+        mock_exporter = MagicMock()
+        mock_exporter.shard_size = None
+        mock_exporter.save_export.return_value = export
+        mock_exporter_class = MagicMock(return_value=mock_exporter)
+        serialized = serialize_exporter_params({'user': user, 'recipients': [user]})
+
+        with patch.object(Export, 'send_mail'):
+            execute_export(mock_exporter_class, serialized, 'en', scheduler_id=scheduler.pk, execution_id=execution.pk)
+
+        mock_exporter.save_export.assert_called_once_with(job_id=None, scheduler_id=scheduler.pk)
+        execution.refresh_from_db()
+        assert execution.export == export
+        assert execution.total == export.total
+        assert execution.status == Export.STATUS_PENDING
+
+        execution = scheduler.add_execution()
+        mock_exporter.save_export.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            execute_export(mock_exporter_class, serialized, 'en', scheduler_id=scheduler.pk, execution_id=execution.pk)
+
+        execution.refresh_from_db()
+        assert execution.status == Export.STATUS_FAILED
+        assert execution.finished is not None
+
     def test_execute_export_imports_exporter_class_from_path(self, user):
         mock_export = MagicMock()
         mock_export.id = 1
         mock_export.total = 3
         mock_exporter = MagicMock()
+        mock_exporter.shard_size = None
         mock_exporter.save_export.return_value = mock_export
         mock_exporter_class = MagicMock(return_value=mock_exporter)
         serialized = serialize_exporter_params({'user': user, 'recipients': [user], 'filename': 'x.xlsx'})
 
-        with patch('outputs.jobs.import_string', return_value=mock_exporter_class) as mock_import:
+        with patch('outputs.registry.import_string', return_value=mock_exporter_class) as mock_import:
             execute_export('outputs.tests.exporters.MockExporter', serialized, 'en')
 
         mock_import.assert_called_once_with('outputs.tests.exporters.MockExporter')
         mock_export.send_mail.assert_called_once_with('en', 'x.xlsx')
 
 
+    def test_execute_export_retried_job_keeps_its_export(self, user, export):
+        """Retried job doesn't save another export, it continues with the export of its previous attempt."""
+        export.job_id = 'job-1'
+        export.save(update_fields=['job_id'])
+
+        mock_exporter = MagicMock()
+        mock_exporter.shard_size = None
+        mock_exporter_class = MagicMock(return_value=mock_exporter)
+        serialized = serialize_exporter_params({'user': user, 'recipients': [user]})
+
+        with patch('outputs.jobs.get_current_job_id', return_value='job-1'), \
+             patch.object(Export, 'send_mail') as mock_send_mail:
+            execute_export(mock_exporter_class, serialized, 'en')
+
+        mock_exporter.save_export.assert_not_called()
+        mock_send_mail.assert_called_once_with('en', None)
+
+        with patch('outputs.jobs.get_current_job_id', return_value='job-2'):
+            execute_export(mock_exporter_class, serialized, 'en')
+
+        mock_exporter.save_export.assert_called_once_with(job_id='job-2', scheduler_id=None)
+
+
 class TestMailExportById:
     """Tests for mail_export_by_id job."""
 
@@ -204,6 +280,15 @@ class TestMailExportById:
                         'en'
                     )
 
+    def test_mail_export_by_id_skips_finished_export(self, export):
+        """Test retried job of an already finished export doesn't export it again."""
+        Export.objects.filter(pk=export.pk).update(status=Export.STATUS_FINISHED)
+
+        with patch('outputs.jobs.export_items') as mock_export_items:
+            mail_export_by_id(export.pk, 'outputs.models.Export', 'en')
+
+        mock_export_items.assert_not_called()
+
     def test_mail_export_by_id_status_update(self, export):
         """Test status update."""
         with patch('outputs.jobs.import_string') as mock_import:
@@ -0,0 +1,47 @@
+"""
+Tests for data migrations.
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils.timezone import now
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSchedulerExecutionMigration:
+    """Tests for copying scheduler executions into SchedulerExecution table."""
+
+    migrate_from = [('outputs', '0028_scheduler_incremental')]
+    migrate_to = [('outputs', '0029_schedulerexecution')]
+
+    @pytest.fixture(autouse=True)
+    def restore_migrations(self):
+        yield
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_copy_executions(self, settings):
+        apps = self.migrate(self.migrate_from)
+        ContentType = apps.get_model('contenttypes', 'ContentType')
+        Scheduler = apps.get_model('outputs', 'Scheduler')
+
+        content_type, _ = ContentType.objects.get_or_create(app_label='outputs', model='samplemodel')
+        executions = [now() - timedelta(days=2), now() - timedelta(days=1)]
+        scheduler = Scheduler.objects.create(
+            content_type=content_type, format='XLSX', context='LIST', routine='DAILY', executions=executions
+        )
+        Scheduler.objects.create(content_type=content_type, format='XLSX', context='LIST', routine='DAILY')
+
+        apps = self.migrate(self.migrate_to)
+        SchedulerExecution = apps.get_model('outputs', 'SchedulerExecution')
+
+        assert list(SchedulerExecution.objects.order_by('created').values_list('scheduler_id', 'status', 'created')) == [
+            (scheduler.id, '', created) for created in executions
+        ]
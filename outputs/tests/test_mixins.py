@@ -1,6 +1,8 @@
 """
 Tests for mixins.
 """
+import codecs
+import io
 from types import SimpleNamespace
 
 import pytest
@@ -9,12 +11,16 @@ from django.http import QueryDict
 
 from outputs.mixins import (
     ExportFieldsPermissionsMixin, ConfirmExportMixin, SelectExportMixin,
-    FilterExporterMixin, ExporterMixin, ExcelExporterMixin
+    FilterExporterMixin, ExporterMixin, ExcelExporterMixin, CsvExporterMixin
 )
 from outputs.models import Export
 from outputs.tests.models import SampleModel
 
 
+def get_test_cache_version(exporter):
+    return 'v1'
+
+
 class TestExportFieldsPermissionsMixin:
     """Tests for ExportFieldsPermissionsMixin."""
 
@@ -120,6 +126,7 @@ class TestConfirmExportMixin:
     def test_confirm_export_mixin_get_objects_count(self):
         """Test object count."""
         mixin = ConfirmExportMixin()
+        mixin.exporter_class = Mock(spec=[])
         mixin.get_exporter = Mock(return_value=Mock(
             get_queryset=Mock(return_value=Mock(count=Mock(return_value=10)))
         ))
@@ -332,6 +339,78 @@ class TestFilterExporterMixin:
             body = mixin.get_message_body(count=10)
             assert body == 'Test body'
 
+    def get_count_exporter_class(self):
+        import django_filters
+
+        class SampleFilter(django_filters.FilterSet):
+            class Meta:
+                model = SampleModel
+                fields = ['name']
+
+        class CountExporter(FilterExporterMixin):
+            queryset = SampleModel.objects.all()
+            filter_class = SampleFilter
+
+        return CountExporter
+
+    def test_filter_exporter_mixin_count_objects(self, db):
+        """Objects are counted by filter of the exporter class."""
+        SampleModel.objects.create(name='test', email='test@example.com')
+        SampleModel.objects.create(name='other', email='other@example.com')
+        exporter_class = self.get_count_exporter_class()
+
+        with patch.object(exporter_class, '__init__') as mock_init:
+            assert exporter_class.count_objects(QueryDict('name=test')) == 1
+            assert exporter_class.count_objects(QueryDict('')) == 2
+
+        mock_init.assert_not_called()
+
+    def test_filter_exporter_mixin_count_objects_customized(self):
+        """Exporter customizing its queryset is counted by its instance."""
+        exporter_class = self.get_count_exporter_class()
+
+        class CustomExporter(exporter_class):
+            def get_queryset(self):
+                return super().get_queryset().filter(is_active=True)
+
+        assert CustomExporter.count_objects(QueryDict('')) is None
+        assert exporter_class.count_objects(QueryDict('proxy=sample')) is None
+
+    def test_confirm_export_mixin_get_objects_count_from_class(self, db):
+        """Confirmation page counts objects without instantiating the exporter."""
+        SampleModel.objects.create(name='test', email='test@example.com')
+        mixin = ConfirmExportMixin()
+        mixin.request = Mock()
+        mixin.request.GET = QueryDict('name=test&back_url=/test/')
+        mixin.exporter_class = self.get_count_exporter_class()
+        mixin.get_exporter = Mock()
+
+        assert mixin.get_objects_count() == 1
+        mixin.get_exporter.assert_not_called()
+
+    def test_confirm_export_mixin_get_objects_count_of_custom_exporter_params(self, db):
+        """Objects of view narrowing the queryset of the exporter by its params are counted by exporter instance."""
+        SampleModel.objects.create(name='test', email='test@example.com')
+        SampleModel.objects.create(name='test', email='other@example.com')
+        exporter_class = self.get_count_exporter_class()
+
+        class CustomParamsMixin(ConfirmExportMixin):
+            @property
+            def exporter_params(self):
+                return dict(
+                    super().exporter_params, queryset=SampleModel.objects.filter(email='test@example.com')
+                )
+
+        mixin = CustomParamsMixin()
+        mixin.request = Mock()
+        mixin.request.GET = QueryDict('name=test&back_url=/test/')
+        mixin.exporter_class = exporter_class
+
+        with patch.object(exporter_class, 'count_objects', wraps=exporter_class.count_objects) as mock_count_objects:
+            assert mixin.get_objects_count() == 1
+
+        mock_count_objects.assert_not_called()
+
 
 class TestExporterMixin:
     """Tests for ExporterMixin."""
@@ -422,6 +501,49 @@ class TestExporterMixin:
         output = exporter.get_output()
         assert output == b'test content'
 
+    def test_exporter_mixin_get_output_file(self):
+        """Test output file is spooled and returned rewound without a copy."""
+        import tempfile
+
+        exporter = ExporterMixin(user=None, recipients=[])
+        exporter.output.write(b'test content')
+
+        output_file = exporter.get_output_file()
+        assert isinstance(output_file, tempfile.SpooledTemporaryFile)
+        assert output_file is exporter.output
+        assert output_file.read() == b'test content'
+
+    def test_exporter_mixin_compression(self):
+        """Test output is compressed once when it is read and filename and content type are adjusted."""
+        import zipfile
+
+        exporter = ExporterMixin(user=None, recipients=[], filename='test.xml', compression='zip')
+        exporter.output.write(b'test content')
+
+        assert exporter.get_output_filename() == 'test.xml.zip'
+        assert exporter.get_output_filename('other.xml') == 'other.xml.zip'
+        assert exporter.get_output_content_type() == 'application/zip'
+
+        output = exporter.get_output()
+        assert exporter.get_output() == output
+
+        with zipfile.ZipFile(io.BytesIO(output)) as archive:
+            assert archive.read('test.xml') == b'test content'
+
+    def test_exporter_mixin_get_cache_version(self, export):
+        """Test data version is the latest modification of exported objects or result of configured callable."""
+        from outputs import settings as outputs_settings
+
+        exporter = ExporterMixin(user=None, recipients=[], queryset=Export.objects.all())
+        assert exporter.get_cache_version() == export.modified
+
+        # model without modification time
+        exporter.queryset = SampleModel.objects.all()
+        assert exporter.get_cache_version() is None
+
+        with patch.object(outputs_settings, 'OUTPUT_CACHE_VERSION', 'outputs.tests.test_mixins.get_test_cache_version'):
+            assert exporter.get_cache_version() == 'v1'
+
     def test_exporter_mixin_export_to_response(self):
         """Test export to response."""
         exporter = ExporterMixin(user=None, recipients=[])
@@ -500,6 +622,79 @@ class TestExporterMixin:
         # Check that fields are saved
         assert export.fields == ['name', 'email']
 
+    def test_exporter_mixin_save_export_options(self, user):
+        """Test options overridden by constructor kwargs are saved and passed to the rebuilt exporter."""
+        from django.http import QueryDict
+        from django.contrib.contenttypes.models import ContentType
+        exporter = ExporterMixin(user=user, recipients=[user], compression='gzip', shard_size=500)
+        exporter.queryset = SampleModel.objects.all()
+        exporter.export_format = Export.FORMAT_XLSX
+        exporter.export_context = Export.CONTEXT_LIST
+        exporter.params = QueryDict('')
+        exporter.selected_fields = None
+        exporter.get_queryset = lambda: exporter.queryset
+
+        content_type, _ = ContentType.objects.get_or_create(app_label='outputs', model='samplemodel')
+
+        with patch('outputs.mixins.ContentType.objects.get_for_model', return_value=content_type):
+            export = exporter.save_export()
+
+        export.refresh_from_db()
+        assert export.options == {'compression': 'gzip', 'shard_size': 500}
+        assert export.exporter_params['compression'] == 'gzip'
+        assert export.exporter_params['shard_size'] == 500
+
+    def test_exporter_mixin_save_export_total_without_count(self, user):
+        """Test total is taken from number of created items instead of a COUNT query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.contrib.contenttypes.models import ContentType
+        exporter = ExporterMixin(user=user, recipients=[user])
+        exporter.queryset = SampleModel.objects.all()
+        exporter.export_format = Export.FORMAT_XLSX
+        exporter.export_context = Export.CONTEXT_LIST
+        exporter.params = QueryDict('')
+        exporter.get_queryset = lambda: exporter.queryset
+
+        content_type, _ = ContentType.objects.get_or_create(app_label='outputs', model='samplemodel')
+        for i in range(3):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        with patch('outputs.mixins.ContentType.objects.get_for_model', return_value=content_type):
+            with CaptureQueriesContext(connection) as queries:
+                export = exporter.save_export()
+
+        assert all('COUNT(' not in query['sql'] for query in queries)
+        export.refresh_from_db()
+        assert export.total == 3
+        assert sorted(export.items.values_list('detail', flat=True)) == ['Test0', 'Test1', 'Test2']
+
+    def test_exporter_mixin_save_export_without_detail(self, user):
+        """Test items are inserted from the queryset without fetching objects when detail is skipped."""
+        from django.contrib.contenttypes.models import ContentType
+
+        class TestExporter(ExporterMixin):
+            export_format = Export.FORMAT_XLSX
+            export_context = Export.CONTEXT_LIST
+            export_item_detail = False
+
+        exporter = TestExporter(user=user, recipients=[user], queryset=SampleModel.objects.filter(is_active=True))
+        exporter.params = QueryDict('')
+
+        content_type, _ = ContentType.objects.get_or_create(app_label='outputs', model='samplemodel')
+        active = [SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com') for i in range(3)]
+        SampleModel.objects.create(name='Inactive', email='inactive@example.com', is_active=False)
+
+        with patch('outputs.mixins.ContentType.objects.get_for_model', return_value=content_type):
+            with patch('outputs.mixins.queryset_chunks') as mock_chunks:
+                export = exporter.save_export()
+
+        mock_chunks.assert_not_called()
+        export.refresh_from_db()
+        assert export.total == 3
+        assert set(export.items.values_list('object_id', flat=True)) == {obj.pk for obj in active}
+        assert set(export.items.values_list('detail', flat=True)) == {''}
+
     def test_save_export_whistle_notifies_superusers(self, user):
         """With whistle installed, superuser notification runs after export and items are saved."""
         from django.contrib.contenttypes.models import ContentType
@@ -537,27 +732,55 @@ class TestExporterMixin:
 class TestExcelExporterMixin:
     """Tests for ExcelExporterMixin."""
 
-    def test_excel_exporter_mixin_write_row(self):
-        """Test writing row."""
+    def test_excel_exporter_mixin_write_rows(self):
+        """Test writing rows of compiled fields."""
         with patch('xlsxwriter.Workbook') as mock_workbook_ctor:
             mock_workbook = Mock()
             mock_worksheet = Mock()
             mock_workbook.add_worksheet.return_value = mock_worksheet
             mock_workbook_ctor.return_value = mock_workbook
-            
+
             class TestExcelExporter(ExcelExporterMixin):
                 def get_queryset(self):
                     return SampleModel.objects.none()
-                
+
                 def get_worksheet_title(self, index=0):
                     return 'Test'
-            
+
             exporter = TestExcelExporter(user=None, recipients=[])
-            field = ('name', 'Name', 20)
+            fields, iterative_sets_fields = exporter.compile_fields([('name', 'Name', 20)], [])
             obj = SampleModel(name='Test', email='test@example.com')
-            
-            exporter.write_row(mock_worksheet, 0, 0, obj, field)
-            assert mock_worksheet.write.called
+            rows = [exporter.get_row_values(obj, fields, iterative_sets_fields)]
+
+            assert exporter.write_rows(mock_worksheet, rows, 1, 0) == (2, 1)
+            mock_worksheet.write.assert_called_once_with(1, 0, 'Test', None)
+
+    def test_excel_exporter_mixin_compile_field(self):
+        """Test field definition is compiled into ExcelField with its format and write method."""
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+
+        name_field = exporter.compile_field(('name', 'Name', 20))
+        assert name_field.cell_format is None
+        assert name_field.function is None
+        assert name_field.write == name_field.write_value
+
+        created_field = exporter.compile_field(('created', 'Created', 15, 'datetime', lambda value, obj: value))
+        assert created_field.cell_format is exporter.formats['datetime']
+        assert created_field.arity == 2
+        assert created_field.write == created_field.write_date
+
+        fields, iterative_sets_fields = exporter.compile_fields(
+            [('name', 'Name', 20)],
+            [{'set_attr': 'item_set', 'fields': [('email', 'Email', 20, 'bold')], 'iteration_number': 2, 'verbose_name': 'item'}]
+        )
+        assert fields[0].attribute == 'name'
+        assert iterative_sets_fields[0]['set_attr'] == 'item_set'
+        assert iterative_sets_fields[0]['iteration_number'] == 2
+        assert iterative_sets_fields[0]['fields'][0].cell_format is exporter.formats['bold']
 
     def test_excel_exporter_mixin_write_header(self):
         """Test writing header."""
@@ -610,8 +833,8 @@ class TestExcelExporterMixin:
             assert len(fields) == 1
             assert fields[0][0] == 'name'
 
-    def test_excel_exporter_mixin_get_paginator(self):
-        """Test pagination."""
+    def test_excel_exporter_mixin_get_chunks(self):
+        """Test chunking by primary key."""
         with patch('xlsxwriter.Workbook') as mock_workbook_ctor:
             mock_workbook = Mock()
             mock_workbook_ctor.return_value = mock_workbook
@@ -630,8 +853,445 @@ class TestExcelExporterMixin:
                 SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
             
             with patch('outputs.mixins.settings') as mock_settings:
-                mock_settings.NUMBER_OF_THREADS = 4
-                paginator = exporter.get_paginator(exporter.get_queryset())
-                # Should return paginator when count > NUMBER_OF_THREADS
-                assert paginator is not None
+                mock_settings.CHUNK_SIZE = 4
+                chunks = list(exporter.get_chunks(exporter.get_queryset()))
+                # Should split objects into chunks of CHUNK_SIZE
+                assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+    def test_excel_exporter_mixin_constant_memory(self):
+        """Test constant memory mode writes rows sequentially into a temp file backed workbook."""
+        import zipfile
+
+        class TestExcelExporter(ExcelExporterMixin):
+            constant_memory = True
+
+            def get_queryset(self):
+                return SampleModel.objects.order_by('pk')
+
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20), ('email', 'Email', 30)]}
+
+        for i in range(10):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+        assert not isinstance(exporter.output, io.BytesIO)
+
+        exporter.export()
+
+        with zipfile.ZipFile(io.BytesIO(exporter.get_output())) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+
+        # constant memory mode writes inline strings in row order
+        positions = [sheet.index(f'Test{i}<') for i in range(10)]
+        assert positions == sorted(positions)
+        assert '<row r="11"' in sheet
+
+    def test_excel_exporter_mixin_iterate_rows_keeps_order(self):
+        """Test pipeline yields rows of all chunks in their original order."""
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+        fields, _ = exporter.compile_fields([('name', 'Name', 20)], [])
+        chunks = [
+            [SampleModel(name=f'Test{chunk}-{i}') for i in range(chunk + 1)]
+            for chunk in range(6)
+        ]
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.NUMBER_OF_THREADS = 3
+            rows = list(exporter.iterate_rows(fields, [], chunks))
+
+        expected = [obj.name for chunk in chunks for obj in chunk]
+        assert [values[0][1] for values in rows] == expected
+        assert all(values[0][0] == fields[0] for values in rows)
+
+    def test_excel_exporter_mixin_iterate_rows_reports_progress(self):
+        """Test written rows are reported once per chunk."""
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+        progress = Mock()
+        exporter = TestExcelExporter(user=None, recipients=[], progress=progress)
+        fields, _ = exporter.compile_fields([('name', 'Name', 20)], [])
+        chunks = [[SampleModel(name='Test')] * size for size in (3, 3, 1)]
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.NUMBER_OF_THREADS = 2
+            list(exporter.iterate_rows(fields, [], chunks))
+
+        assert [call.args for call in progress.add.call_args_list] == [(3,), (3,), (1,)]
+
+    def test_excel_exporter_mixin_iterate_rows_raises_worker_exception(self):
+        """Test exception of a worker is not swallowed."""
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+        def fail(value):
+            if value == 'broken':
+                raise ValueError('broken value')
+            return value
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+        fields, _ = exporter.compile_fields([('name', 'Name', 20, None, fail)], [])
+        chunks = [[SampleModel(name='ok')], [SampleModel(name='broken')], [SampleModel(name='ok')]]
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.NUMBER_OF_THREADS = 2
+            with pytest.raises(ValueError):
+                list(exporter.iterate_rows(fields, [], chunks))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_excel_exporter_mixin_write_content_pipeline(self):
+        """Test chunks formatted by worker threads are written in order without lost rows."""
+        import zipfile
+
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_queryset(self):
+                return SampleModel.objects.order_by('pk')
+
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20), ('email', 'Email', 30)]}
+
+        for i in range(25):
+            SampleModel.objects.create(name=f'Test{i:02}', email=f'test{i}@example.com')
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.NUMBER_OF_THREADS = 4
+            mock_settings.CHUNK_SIZE = 3
+            exporter.export()
+
+        with zipfile.ZipFile(io.BytesIO(exporter.get_output())) as archive:
+            shared_strings = archive.read('xl/sharedStrings.xml').decode()
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+
+        positions = [shared_strings.index(f'Test{i:02}<') for i in range(25)]
+        assert positions == sorted(positions)
+        assert '<row r="26"' in sheet
+        assert '<row r="27"' not in sheet
+
+    @pytest.mark.django_db(transaction=True)
+    def test_excel_exporter_mixin_write_content_processes(self):
+        """Test chunks formatted by worker processes are written in order with iterations counted by workers."""
+        import multiprocessing
+        import zipfile
+        from django.contrib.auth.models import Group
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            pytest.skip('fork start method is not available')
+
+        groups = self.create_groups_with_users()
+        groups.extend(Group.objects.create(name=f'Empty{i}') for i in range(4))
+        outputs = {}
+
+        for processes in (None, 2):
+            exporter = self.get_group_exporter_class()(
+                user=None, recipients=[], selected_fields=['name', 'username'], processes=processes
+            )
+
+            with patch('outputs.mixins.settings') as mock_settings:
+                mock_settings.NUMBER_OF_THREADS = 2
+                mock_settings.CHUNK_SIZE = 2
+
+                with patch.object(exporter, 'iterate_rows', wraps=exporter.iterate_rows) as iterate_rows:
+                    exporter.export()
+
+            assert iterate_rows.called is not bool(processes)
+
+            with zipfile.ZipFile(io.BytesIO(exporter.get_output())) as archive:
+                outputs[processes] = [
+                    archive.read(name) for name in ('xl/sharedStrings.xml', 'xl/worksheets/sheet1.xml')
+                ]
+
+        shared_strings = outputs[2][0].decode()
+        positions = [shared_strings.index(f'{group.name}<') for group in groups]
+        assert positions == sorted(positions)
+        assert 'user #3: Username<' in shared_strings
+        assert outputs[2] == outputs[None]
+
+    def test_excel_exporter_mixin_use_processes(self):
+        """Test worker processes are not used inside atomic blocks, their connections can't see its changes."""
+        from django.db import transaction
+
+        exporter = self.get_group_exporter_class()(user=None, recipients=[], processes=2)
+
+        with patch('outputs.mixins.multiprocessing.get_all_start_methods', return_value=['fork', 'spawn']):
+            assert exporter.use_processes() is False
+
+            with patch.object(transaction.get_connection(), 'in_atomic_block', False):
+                assert exporter.use_processes() is True
+
+            exporter.processes = None
+
+            with patch.object(transaction.get_connection(), 'in_atomic_block', False):
+                assert exporter.use_processes() is False
+
+    def test_excel_exporter_mixin_write_content_prefetches_iterative_sets(self, django_assert_num_queries):
+        """Test relatives of iterative sets cost one query per chunk instead of one query per row."""
+        import zipfile
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group
+
+        User = get_user_model()
+
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+        groups = [Group.objects.create(name=f'Group{i}') for i in range(2)]
+
+        for i in range(7):
+            User.objects.create(username=f'user{i}').groups.set(groups)
+
+        exporter = TestExcelExporter(user=None, recipients=[])
+        worksheet = exporter.workbook.add_worksheet('Test')
+        fields = [('username', 'Username', 20)]
+        iterative_sets_fields = [
+            {'set_attr': 'groups', 'fields': [('name', 'Name', 20)], 'iteration_number': 2, 'verbose_name': 'group'},
+            {'set_attr': 'user_permissions', 'fields': [], 'iteration_number': 0, 'verbose_name': 'permission'},
+        ]
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.NUMBER_OF_THREADS = 2
+            mock_settings.CHUNK_SIZE = 3
+
+            # 3 chunks, each of them a query of users and a query of their groups
+            with django_assert_num_queries(6):
+                exporter.write_content(worksheet, fields, iterative_sets_fields, User.objects.order_by('pk'))
+
+        exporter.workbook.close()
+
+        with zipfile.ZipFile(io.BytesIO(exporter.get_output())) as archive:
+            shared_strings = archive.read('xl/sharedStrings.xml').decode()
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+
+        assert 'Group0<' in shared_strings and 'Group1<' in shared_strings
+        assert '<row r="8"' in sheet
+
+    def create_groups_with_users(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group
+
+        User = get_user_model()
+        groups = [Group.objects.create(name=f'Group{i}') for i in range(3)]
+
+        for i, group in enumerate(groups):
+            for j in range(i + 1):
+                User.objects.create(username=f'user{i}-{j}').groups.add(group)
+
+        return groups
+
+    def get_group_exporter_class(self):
+        from django.contrib.auth.models import Group
+
+        class TestExcelExporter(ExcelExporterMixin):
+            def get_queryset(self):
+                return Group.objects.order_by('pk')
+
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20)]}
+
+            @staticmethod
+            def selectable_iterative_sets():
+                return {
+                    'user_set': {'Users': [('username', 'Username', 20), ('email', 'Email', 20)]},
+                    'permissions_set': {'Permissions': [('codename', 'Codename', 20)]},
+                }
+
+        return TestExcelExporter
+
+    def test_excel_exporter_mixin_get_selected_fields_iterative_sets(self, django_assert_num_queries):
+        """Test number of iterations is a single aggregate query and verbose name comes from model metadata."""
+        from django.contrib.auth.models import Group
+
+        self.create_groups_with_users()
+        exporter = self.get_group_exporter_class()(user=None, recipients=[], selected_fields=['name', 'username'])
+
+        with django_assert_num_queries(1) as captured:
+            fields, iterative_sets_fields = exporter.get_selected_fields(Group.objects.all())
+
+        assert 'MAX' in captured.captured_queries[0]['sql']
+        assert [field[0] for field in fields] == ['name']
+        assert iterative_sets_fields[0]['iteration_number'] == 3
+        assert iterative_sets_fields[0]['verbose_name'] == 'user'
+        assert [field[0] for field in iterative_sets_fields[0]['fields']] == ['username']
+        # set without selected fields is not counted
+        assert iterative_sets_fields[1]['iteration_number'] == 0
+        assert iterative_sets_fields[1]['verbose_name'] == 'permission'
+
+        with django_assert_num_queries(0):
+            fields, iterative_sets_fields = exporter.get_selected_fields(Group.objects.all(), count_iterations=False)
 
+        assert iterative_sets_fields[0]['iteration_number'] is None
+
+    def test_excel_exporter_mixin_get_selected_fields_iterative_sets_without_relatives(self):
+        """Test sets without any relatives have no iterations."""
+        from django.contrib.auth.models import Group
+
+        Group.objects.create(name='Empty')
+        exporter = self.get_group_exporter_class()(user=None, recipients=[], selected_fields=['name', 'username'])
+
+        fields, iterative_sets_fields = exporter.get_selected_fields(Group.objects.all())
+
+        assert iterative_sets_fields[0]['iteration_number'] == 0
+        assert iterative_sets_fields[0]['verbose_name'] == 'user'
+
+    @pytest.mark.parametrize('constant_memory', [False, True])
+    def test_excel_exporter_mixin_export_iterative_sets_header(self, constant_memory):
+        """Test header of iterative sets is the same whether iterations are counted in advance or while writing."""
+        import zipfile
+
+        self.create_groups_with_users()
+        exporter = self.get_group_exporter_class()(
+            user=None, recipients=[], selected_fields=['name', 'username'], constant_memory=constant_memory
+        )
+
+        with patch.object(exporter, 'count_iterations', wraps=exporter.count_iterations) as count_iterations:
+            exporter.export()
+
+        counted_sets = count_iterations.call_args[0][1]
+        assert counted_sets[0]['iteration_number'] == 3
+
+        with zipfile.ZipFile(io.BytesIO(exporter.get_output())) as archive:
+            content = ''.join(
+                archive.read(name).decode() for name in archive.namelist()
+                if name in ('xl/sharedStrings.xml', 'xl/worksheets/sheet1.xml')
+            )
+
+        assert 'user #3: Username<' in content
+        assert 'user #4: Username<' not in content
+        assert 'user2-2<' in content
+
+
+class TestCsvExporterMixin:
+    """Tests for CsvExporterMixin."""
+
+    def get_exporter_class(self):
+        class TestCsvExporter(CsvExporterMixin):
+            filename = 'test.csv'
+
+            def get_queryset(self):
+                return SampleModel.objects.order_by('pk')
+
+            @staticmethod
+            def selectable_fields():
+                return {
+                    'group1': [
+                        ('name', 'Name', 20),
+                        ('email', 'Email', 30),
+                        ('is_active', 'Active', 8, None, lambda value: 'Yes' if value else 'No'),
+                        ('created', 'Name and email', 20, None, lambda value, obj: f'{obj.name}, {obj.email}'),
+                    ]
+                }
+
+        return TestCsvExporter
+
+    def test_csv_exporter_mixin_export(self):
+        """Test header and rows of selected fields are written into the output."""
+        for i in range(3):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com', is_active=i != 1)
+
+        exporter = self.get_exporter_class()(user=None, recipients=[])
+        exporter.export()
+
+        assert exporter.export_format == Export.FORMAT_CSV
+        assert exporter.get_output().decode().splitlines() == [
+            'Name,Email,Active,Name and email',
+            'Test0,test0@example.com,Yes,"Test0, test0@example.com"',
+            'Test1,test1@example.com,No,"Test1, test1@example.com"',
+            'Test2,test2@example.com,Yes,"Test2, test2@example.com"',
+        ]
+
+    def test_csv_exporter_mixin_reports_progress(self):
+        """Test written rows are reported once per chunk."""
+        for i in range(3):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        progress = Mock()
+        exporter = self.get_exporter_class()(user=None, recipients=[], progress=progress)
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.CHUNK_SIZE = 2
+            exporter.export()
+
+        assert [call.args for call in progress.add.call_args_list] == [(2,), (1,)]
+
+    def test_csv_exporter_mixin_selected_fields(self):
+        """Test only selected fields are exported."""
+        SampleModel.objects.create(name='Test', email='test@example.com')
+
+        exporter = self.get_exporter_class()(user=None, recipients=[], selected_fields=['email'])
+        exporter.export()
+
+        assert exporter.get_output().decode().splitlines() == ['Email', 'test@example.com']
+
+    def test_csv_exporter_mixin_export_to_response_streams_chunks(self):
+        """Test response is streamed chunk by chunk after the header."""
+        from django.http import StreamingHttpResponse
+
+        for i in range(5):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        exporter = self.get_exporter_class()(user=None, recipients=[], selected_fields=['name'])
+
+        with patch('outputs.mixins.settings') as mock_settings:
+            mock_settings.CHUNK_SIZE = 2
+            response = exporter.export_to_response()
+
+            assert isinstance(response, StreamingHttpResponse)
+            assert response['Content-Type'] == 'text/csv'
+            assert response['Content-Disposition'] == 'attachment; filename=test.csv'
+
+            parts = list(response.streaming_content)
+
+        assert parts == [b'Name\r\n', b'Test0\r\nTest1\r\n', b'Test2\r\nTest3\r\n', b'Test4\r\n']
+
+    def test_csv_exporter_mixin_encoding(self):
+        """Test byte order mark of utf-8-sig encoding is written only once."""
+        SampleModel.objects.create(name='Čučoriedka', email='test@example.com')
+
+        exporter = self.get_exporter_class()(user=None, recipients=[], selected_fields=['name'], encoding='utf-8-sig')
+        exporter.export()
+
+        output = exporter.get_output()
+        assert output.count(codecs.BOM_UTF8) == 1
+        assert output.decode('utf-8-sig').splitlines() == ['Name', 'Čučoriedka']
+
+    def test_csv_exporter_mixin_compression(self):
+        """Test CSV is compressed while written and while streamed."""
+        import gzip
+
+        for i in range(5):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        exporter = self.get_exporter_class()(user=None, recipients=[], selected_fields=['name'], compression='gzip')
+
+        with patch.object(exporter, 'compress_output') as compress_output:
+            exporter.export()
+            output = exporter.get_output()
+
+        assert not compress_output.called
+        assert gzip.decompress(output).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(5)]
+
+        response = exporter.export_to_response()
+        assert response['Content-Type'] == 'application/gzip'
+        assert response['Content-Disposition'] == 'attachment; filename=test.csv.gz'
+        assert gzip.decompress(b''.join(response.streaming_content)) == gzip.decompress(output)
@@ -8,6 +8,11 @@ from unittest.mock import patch
 
 from outputs.models import Export, ExportItem, Scheduler
 from outputs.tests.models import SampleModel
+from outputs.mixins import FilterExporterMixin
+
+
+class FilteredSampleExporter(FilterExporterMixin):
+    queryset = SampleModel.objects.all()
 
 
 class TestExport:
@@ -19,12 +24,12 @@ class TestExport:
 
     def test_export_exporter_class(self, export, exporter_class):
         """Test exporter class property."""
-        with patch('outputs.models.import_string', return_value=exporter_class):
+        with patch('outputs.registry.import_string', return_value=exporter_class):
             assert export.exporter_class == exporter_class
 
     def test_export_exporter(self, export, exporter_class):
         """Test exporter instance property."""
-        with patch('outputs.models.import_string', return_value=exporter_class):
+        with patch('outputs.registry.import_string', return_value=exporter_class):
             exporter = export.exporter
             assert exporter is not None
             assert exporter.user == export.creator
@@ -198,6 +203,28 @@ class TestExport:
         updated_count = export.update_export_items_result(ExportItem.RESULT_SUCCESS)
         assert updated_count == 0
 
+    def test_export_get_progress(self, export):
+        """Test progress is estimated from processed items and the start of processing."""
+        from datetime import timedelta
+        from django.utils.timezone import now
+
+        assert export.get_progress() == {
+            'status': Export.STATUS_PENDING, 'processed': 0, 'total': 10, 'percent': 0, 'eta': None
+        }
+
+        export.status = Export.STATUS_PROCESSING
+        export.processed = 4
+        export.started = now() - timedelta(seconds=20)
+        progress = export.get_progress()
+        assert progress['percent'] == 40
+        assert progress['eta'] == 30
+
+        # exporters not reporting their progress are complete once finished
+        export.status = Export.STATUS_FINISHED
+        assert export.get_progress() == {
+            'status': Export.STATUS_FINISHED, 'processed': 10, 'total': 10, 'percent': 100, 'eta': None
+        }
+
     def test_export_status_choices(self):
         """Test status field choices."""
         assert Export.STATUS_PENDING == 'PENDING'
@@ -327,6 +354,66 @@ class TestScheduler:
         scheduler.job_id = ''
         assert scheduler.is_scheduled is False
 
+    def test_scheduler_schedule_time(self, scheduler, mock_rq_queue, settings):
+        """Next execution time is the score of the job in sorted set of scheduled jobs."""
+        import django_rq
+        settings.TIME_ZONE = 'Europe/Bratislava'
+        cron_scheduler = django_rq.get_scheduler('cron')
+        cron_scheduler.connection.zadd(cron_scheduler.scheduled_jobs_key, {'test-job-id': 1767254400})  # 2026-01-01 08:00 UTC
+
+        scheduler.job_id = 'test-job-id'
+        assert scheduler.schedule_time.isoformat() == '2026-01-01T09:00:00+01:00'
+
+        scheduler.job_id = 'unknown-job-id'
+        assert scheduler.schedule_time is None
+
+        scheduler.job_id = ''
+        assert scheduler.schedule_time is None
+
+    def test_scheduler_get_schedule_times(self, mock_rq_queue):
+        """Execution times of many jobs are read by one pipeline."""
+        import django_rq
+        cron_scheduler = django_rq.get_scheduler('cron')
+        cron_scheduler.connection.zadd(cron_scheduler.scheduled_jobs_key, {f'job-{i}': 1767254400 + i for i in range(100)})
+
+        with patch.object(type(cron_scheduler.connection), 'pipeline', wraps=cron_scheduler.connection.pipeline) as mock_pipeline:
+            schedule_times = Scheduler.get_schedule_times([f'job-{i}' for i in range(100)] + ['unknown', ''])
+
+        mock_pipeline.assert_called_once()
+        assert len(schedule_times) == 100
+        assert (schedule_times['job-99'] - schedule_times['job-0']).total_seconds() == 99
+
+    def test_scheduler_prefetch_schedules(self, scheduler, user, content_type, mock_rq_queue):
+        """Prefetched jobs and execution times are read from the instances without querying Redis."""
+        import django_rq
+        from rq.job import Job
+        cron_scheduler = django_rq.get_scheduler('cron')
+        cron_scheduler.connection.zadd(cron_scheduler.scheduled_jobs_key, {'job-1': 1767254400})
+
+        scheduler.job_id = 'job-1'
+        unscheduled = Scheduler(content_type=content_type, routine=Scheduler.ROUTINE_DAILY, job_id='')
+
+        with patch.object(Job, 'fetch_many', wraps=Job.fetch_many) as mock_fetch_many:
+            Scheduler.prefetch_schedules([scheduler, unscheduled])
+
+        mock_fetch_many.assert_called_once()
+
+        with patch.object(Job, 'fetch') as mock_fetch, \
+             patch.object(Scheduler, 'get_schedule_times') as mock_get_schedule_times:
+            assert scheduler.is_scheduled is True
+            assert scheduler.schedule_time is not None
+            assert unscheduled.is_scheduled is False
+            assert unscheduled.schedule_time is None
+
+        mock_fetch.assert_not_called()
+        mock_get_schedule_times.assert_not_called()
+
+        # cancelled schedule forgets prefetched job
+        job = scheduler.job
+        scheduler.cancel_schedule()
+        job.delete.assert_called_once()
+        assert not hasattr(scheduler, '_prefetched_job')
+
     def test_scheduler_routine_description(self, scheduler):
         """Test routine description."""
         scheduler.routine = Scheduler.ROUTINE_DAILY
@@ -334,6 +421,9 @@ class TestScheduler:
 
     def test_scheduler_cron_description(self, scheduler):
         """Test cron description."""
+        from outputs.models import get_cron_description
+        get_cron_description.cache_clear()
+
         scheduler.routine = Scheduler.ROUTINE_DAILY
         class DummyDescriptor:
             def __init__(self, **kwargs):
@@ -346,6 +436,30 @@ class TestScheduler:
             description = scheduler.cron_description
             assert description == 'Daily at 07:00'
 
+        get_cron_description.cache_clear()
+
+    def test_scheduler_cron_description_cached(self, scheduler):
+        """Description of the same cron string in the same language is parsed once."""
+        from django.utils import translation
+        from outputs.models import get_cron_description
+        get_cron_description.cache_clear()
+
+        scheduler.routine = Scheduler.ROUTINE_DAILY
+
+        with patch('outputs.models.ExpressionDescriptor') as mock_descriptor:
+            mock_descriptor.return_value.get_description.return_value = 'At 07:00'
+
+            with translation.override('en'):
+                descriptions = {scheduler.cron_description for i in range(10)}
+
+            with translation.override('de'):
+                scheduler.cron_description
+
+        assert len(descriptions) == 1
+        assert mock_descriptor.call_count == 2
+
+        get_cron_description.cache_clear()
+
     def test_scheduler_exporter_params(self, scheduler):
         """Test exporter parameters."""
         params = scheduler.exporter_params
@@ -353,6 +467,83 @@ class TestScheduler:
         assert 'user' in params
         assert params['user'] == scheduler.creator
 
+    def test_scheduler_clean_incremental_field(self, scheduler):
+        """Incremental scheduler requires a date field of the exported model."""
+        from django.core.exceptions import ValidationError
+        scheduler.is_incremental = True
+
+        for incremental_field in ('', 'unknown', 'name'):
+            scheduler.incremental_field = incremental_field
+            with pytest.raises(ValidationError):
+                scheduler.clean()
+
+        scheduler.incremental_field = 'created'
+
+        with patch('outputs.registry.import_string', return_value=FilteredSampleExporter):
+            scheduler.clean()
+
+    def test_scheduler_clean_incremental_exporter(self, scheduler):
+        """Incremental scheduler requires exporter reading its objects from the passed queryset."""
+        from django.core.exceptions import ValidationError
+        scheduler.is_incremental = True
+        scheduler.incremental_field = 'created'
+
+        class CustomQuerysetExporter(FilteredSampleExporter):
+            def get_queryset(self):
+                return SampleModel.objects.all()
+
+        for exporter_class in (CustomQuerysetExporter, object):
+            with patch('outputs.registry.import_string', return_value=exporter_class):
+                with pytest.raises(ValidationError):
+                    scheduler.clean()
+
+    def test_scheduler_incremental_queryset(self, scheduler, content_type):
+        """Incremental queryset contains only objects created after the last finished export."""
+        scheduler.is_incremental = True
+        scheduler.incremental_field = 'created'
+        SampleModel.objects.create(name='old', email='old@example.com')
+
+        # first execution exports all objects
+        assert scheduler.get_incremental_queryset() is None
+
+        Export.objects.create(
+            content_type=content_type, format=Export.FORMAT_XLSX, context=Export.CONTEXT_LIST,
+            status=Export.STATUS_FAILED, scheduler=scheduler
+        )
+        assert scheduler.get_incremental_queryset() is None
+
+        Export.objects.create(
+            content_type=content_type, format=Export.FORMAT_XLSX, context=Export.CONTEXT_LIST,
+            status=Export.STATUS_FINISHED, scheduler=scheduler
+        )
+        new = SampleModel.objects.create(name='new', email='new@example.com')
+
+        assert list(scheduler.get_incremental_queryset()) == [new]
+
+        scheduler.is_incremental = False
+        assert scheduler.get_incremental_queryset() is None
+
+    def test_scheduler_add_execution_retention(self, scheduler, settings):
+        """Only SCHEDULER_EXECUTIONS_RETENTION latest executions are kept."""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from outputs import settings as outputs_settings
+
+        for days in range(5, 0, -1):
+            scheduler.executions.create(created=now() - timedelta(days=days))
+
+        with patch.object(outputs_settings, 'SCHEDULER_EXECUTIONS_RETENTION', 3):
+            execution = scheduler.add_execution()
+
+        assert execution.status == Export.STATUS_PENDING
+        assert scheduler.executions.count() == 3
+        assert scheduler.executions.first() == execution
+
+        with patch.object(outputs_settings, 'SCHEDULER_EXECUTIONS_RETENTION', None):
+            scheduler.add_execution()
+
+        assert scheduler.executions.count() == 4
+
     def test_scheduler_routine_choices(self):
         """Test routine field choices."""
         assert Scheduler.ROUTINE_DAILY == 'DAILY'
@@ -75,6 +75,30 @@ class TestExportItemQuerySet:
         assert found.first() == item
 
 
+    def test_export_item_queryset_insert_from_queryset(self, export):
+        """Test insert_from_queryset() creates items by a single INSERT ... SELECT statement."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        content_type = ContentType.objects.get_for_model(SampleModel)
+        first = SampleModel.objects.create(name='First', email='first@example.com')
+        second = SampleModel.objects.create(name='Second', email='second@example.com')
+        SampleModel.objects.create(name='Other', email='other@example.com')
+        queryset = SampleModel.objects.filter(pk__in=[first.pk, second.pk]).order_by('-name')
+
+        with CaptureQueriesContext(connection) as queries:
+            inserted = ExportItem.objects.insert_from_queryset(export, content_type, queryset)
+
+        assert inserted == 2
+        assert len(queries) == 1
+        assert queries[0]['sql'].startswith('INSERT INTO')
+        items = ExportItem.objects.by_export_id(export.pk)
+        assert set(items.values_list('object_id', flat=True)) == {first.pk, second.pk}
+        assert all(item.content_type == content_type for item in items)
+        assert all(item.detail == '' and item.result == '' for item in items)
+        assert all(item.created is not None for item in items)
+
+
 class TestSchedulerQuerySet:
     """Tests for SchedulerQuerySet."""
 
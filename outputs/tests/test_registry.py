@@ -0,0 +1,114 @@
+"""
+Tests for registry.
+"""
+import django_filters
+import pytest
+from unittest.mock import patch, PropertyMock
+
+from outputs import registry
+from outputs.mixins import FilterExporterMixin
+from outputs.models import Export
+from outputs.tests.models import SampleModel
+
+
+class SampleFilter(django_filters.FilterSet):
+    class Meta:
+        model = SampleModel
+        fields = ['name']
+
+
+class LabelsExporter(FilterExporterMixin):
+    queryset = SampleModel.objects.all()
+    filter_class = SampleFilter
+    instances = 0
+
+    def __init__(self, params=None, **kwargs):
+        LabelsExporter.instances += 1
+
+    @staticmethod
+    def selectable_fields():
+        return {'Sample': [('name', 'Name'), ('email', 'E-mail')]}
+
+    @staticmethod
+    def selectable_iterative_sets():
+        return {'items': {'Items': [('items__count', 'Items count')]}}
+
+
+class UserFilterExporter(LabelsExporter):
+    def get_filter(self):
+        return self.filter_class(self.params, queryset=self.get_whole_queryset(self.params), user=self.user)
+
+
+class InstanceLabelsExporter:
+    def __init__(self, **kwargs):
+        self.prefix = 'Sample'
+
+    def selectable_fields(self):
+        return {'Sample': [('name', f'{self.prefix} name')]}
+
+
+class TestRegistry:
+    """Tests for the exporter registry."""
+
+    def test_get_exporter_class_imports_path_once(self):
+        with patch('outputs.registry.import_string', return_value=LabelsExporter) as mock_import:
+            assert registry.get_exporter_class('outputs.tests.LabelsExporter') is LabelsExporter
+            assert registry.get_exporter_class('outputs.tests.LabelsExporter') is LabelsExporter
+
+        mock_import.assert_called_once_with('outputs.tests.LabelsExporter')
+
+    def test_get_exporter_arguments(self):
+        assert registry.get_exporter_arguments(LabelsExporter) == {'self', 'params', 'kwargs'}
+
+    def test_get_exporter_labels(self):
+        assert registry.get_exporter_labels(LabelsExporter) == {
+            'name': 'Name', 'email': 'E-mail', 'items__count': 'Items count'
+        }
+        assert registry.get_exporter_labels(InstanceLabelsExporter) is None
+        assert registry.get_selectable_labels(InstanceLabelsExporter()) == {'name': 'Sample name'}
+
+    def test_get_exporter_filter(self):
+        filter = registry.get_exporter_filter(LabelsExporter, {'name': 'test'})
+
+        assert isinstance(filter, SampleFilter)
+        assert filter.queryset.model is SampleModel
+        assert registry.get_exporter_filter(InstanceLabelsExporter, {}) is None
+        assert registry.get_exporter_filter(UserFilterExporter, {}) is None
+
+
+@pytest.mark.django_db
+class TestExportDisplayFromRegistry:
+    """Export labels and params are displayed without instantiating the exporter."""
+
+    def test_get_fields_labels(self, export):
+        export.fields = ['name', 'items__count', 'unknown']
+        LabelsExporter.instances = 0
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock, return_value=LabelsExporter):
+            assert export.get_fields_labels() == ['Name', 'Items count', 'unknown']
+
+        assert LabelsExporter.instances == 0
+
+    def test_get_fields_labels_of_instance(self, export):
+        export.fields = ['name']
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock, return_value=InstanceLabelsExporter):
+            assert export.get_fields_labels() == ['Sample name']
+
+    def test_get_params_display(self, export):
+        LabelsExporter.instances = 0
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock, return_value=LabelsExporter):
+            assert export.get_params_display() == 'Name: test\n'
+
+        assert LabelsExporter.instances == 0
+
+    def test_get_params_display_of_customized_filter(self, export):
+        filter = SampleFilter({'name': 'test'}, queryset=SampleModel.objects.none())
+        exporter = type('Exporter', (), {'filter': filter})()
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock, return_value=UserFilterExporter), \
+             patch.object(Export, 'exporter', new_callable=PropertyMock, return_value=exporter) as mock_exporter:
+            assert export.get_params_display() == 'Name: test\n'
+
+        mock_exporter.assert_called_once()
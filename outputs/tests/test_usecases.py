@@ -4,10 +4,13 @@ Tests for usecases module.
 import pytest
 from django.contrib.contenttypes.models import ContentType
 from django.core import mail
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, PropertyMock, patch
 
 from outputs.models import Export
-from outputs.usecases import export_items, mail_successful_export, get_message
+from outputs.usecases import (
+    export_items, mail_successful_export, get_message, get_attachment, get_shard_ranges, export_shard,
+    ExportProgress, write_part, finish_export, fail_export
+)
 from outputs.tests.models import SampleModel
 
 
@@ -166,6 +169,189 @@ class TestExportItems:
         assert export.status == Export.STATUS_FAILED
 
 
+class TestExportProgress:
+    """Tests for ExportProgress."""
+
+    def test_export_progress_add_throttles_updates(self, export, django_assert_num_queries):
+        """Test reported objects are saved at most once per interval."""
+        progress = ExportProgress(export, interval=60)
+
+        with django_assert_num_queries(0):
+            for i in range(100):
+                progress.add(10)
+
+        with django_assert_num_queries(1):
+            progress.flush()
+
+        export.refresh_from_db()
+        assert export.processed == 1000
+
+        progress.interval = 0
+
+        with django_assert_num_queries(1):
+            progress.add(5)
+
+        export.refresh_from_db()
+        assert export.processed == 1005
+
+    def test_export_items_tracks_progress(self, export, exporter_class, mock_storage, mock_email_backend):
+        """Test export items starts tracking and saves progress reported by the exporter."""
+        exporter = exporter_class(user=export.creator, recipients=export.recipients.all())
+        exporter.export = Mock(side_effect=lambda: exporter.progress.add(7))
+
+        with patch.object(type(export), 'exporter', new_callable=lambda: property(lambda self: exporter)):
+            export_items(export, language='en')
+
+        export.refresh_from_db()
+        assert export.started is not None
+        assert export.processed == 7
+
+
+class TestSchedulerExecution:
+    """Outcome of scheduled exports is recorded in executions of their schedulers."""
+
+    def test_finished_export(self, export, scheduler):
+        from datetime import timedelta
+        from django.utils.timezone import now
+
+        export.scheduler = scheduler
+        export.started = now()
+        export.save(update_fields=['scheduler', 'started'])
+        # execution waited in the queue for an hour before the job started
+        execution = scheduler.executions.create(export=export, created=export.started - timedelta(hours=1))
+
+        with patch('outputs.usecases.mail_successful_export'):
+            finish_export(export, Mock(), Mock())
+
+        execution.refresh_from_db()
+        assert execution.status == Export.STATUS_FINISHED
+        assert execution.total == export.total
+        assert execution.started == export.started
+        assert timedelta(0) <= execution.duration < timedelta(hours=1)
+
+    def test_failed_export(self, export, scheduler):
+        export.scheduler = scheduler
+        export.save(update_fields=['scheduler'])
+        execution = scheduler.executions.create(export=export)
+
+        with patch('outputs.usecases.notify_about_failed_export'):
+            fail_export(export, 'boom')
+
+        execution.refresh_from_db()
+        assert execution.status == Export.STATUS_FAILED
+        assert execution.finished is not None
+
+
+class TestOutputCache:
+    """Tests for output cache of identical exports."""
+
+    def get_exporter_class(self, version):
+        from outputs.mixins import CsvExporterMixin
+
+        class CachedCsvExporter(CsvExporterMixin):
+            queryset = SampleModel.objects.order_by('pk')
+            filename = 'test.csv'
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20)]}
+
+            def get_cache_version(self):
+                return version[0]
+
+        return CachedCsvExporter
+
+    def run_export(self, exporter_class, user):
+        exporter = exporter_class(user=user, recipients=[user])
+        export = exporter.save_export()
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock(return_value=exporter_class)), \
+             patch.object(exporter_class, 'iterate_csv', autospec=True, side_effect=exporter_class.iterate_csv) as mock_iterate:
+            export_items(export, language='en', filename='test.csv')
+
+        export.refresh_from_db()
+        assert export.status == Export.STATUS_FINISHED
+        return mock_iterate.called
+
+    @pytest.fixture
+    def output_cache(self, settings, tmp_path):
+        from outputs import settings as outputs_settings
+
+        settings.MEDIA_ROOT = str(tmp_path)
+
+        with patch.object(outputs_settings, 'OUTPUT_CACHE_TTL', 600):
+            yield
+
+    def test_identical_export_uses_cached_output(self, user, content_type, mock_email_backend, output_cache):
+        """Test identical export sends the stored output without exporting, changed data are exported again."""
+        from outputs.models import CachedOutput
+
+        for i in range(3):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        version = [1]
+        exporter_class = self.get_exporter_class(version)
+
+        assert self.run_export(exporter_class, user) is True
+        assert CachedOutput.objects.count() == 1
+        assert self.run_export(exporter_class, user) is False
+
+        expected = ['Name', 'Test0', 'Test1', 'Test2']
+        assert [message.attachments[0].get_payload(decode=True).decode().splitlines() for message in mail.outbox] == [
+            expected, expected
+        ]
+
+        # new version of the data
+        version[0] = 2
+        assert self.run_export(exporter_class, user) is True
+
+        # different objects
+        SampleModel.objects.create(name='Test3', email='test3@example.com')
+        assert self.run_export(exporter_class, user) is True
+        assert CachedOutput.objects.count() == 3
+
+    def test_cached_output_expires(self, user, content_type, mock_email_backend, output_cache):
+        """Test outputs stored longer than OUTPUT_CACHE_TTL are not used."""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from outputs.models import CachedOutput
+
+        SampleModel.objects.create(name='Test', email='test@example.com')
+        exporter_class = self.get_exporter_class([1])
+
+        assert self.run_export(exporter_class, user) is True
+        CachedOutput.objects.update(created=now() - timedelta(seconds=601))
+        assert self.run_export(exporter_class, user) is True
+        assert CachedOutput.objects.count() == 1
+
+    def test_store_cached_output_evicts_least_recently_used(self, output_cache):
+        """Test outputs over OUTPUT_CACHE_MAX_SIZE are evicted from the least recently used one."""
+        import io
+        from datetime import timedelta
+        from django.core.files.storage import default_storage
+        from django.utils.timezone import now
+        from outputs import settings as outputs_settings
+        from outputs.models import CachedOutput
+        from outputs.usecases import get_cached_output, store_cached_output
+
+        with patch.object(outputs_settings, 'OUTPUT_CACHE_MAX_SIZE', 25):
+            for index, key in enumerate('abc'):
+                store_cached_output(key, io.BytesIO(b'x' * 10))
+                CachedOutput.objects.filter(key=key).update(used=now() - timedelta(seconds=10 - index))
+
+            assert list(CachedOutput.objects.values_list('key', flat=True)) == ['b', 'c']
+
+            # used output is kept
+            assert get_cached_output('b') is not None
+            store_cached_output('d', io.BytesIO(b'x' * 10))
+            assert sorted(CachedOutput.objects.values_list('key', flat=True)) == ['b', 'd']
+            assert sorted(default_storage.listdir('exports/cache')[1]) == ['b', 'd']
+
+            # output larger than the whole cache is not stored
+            store_cached_output('e', io.BytesIO(b'x' * 30))
+            assert not CachedOutput.objects.filter(key='e').exists()
+
+
 class TestMailExport:
     """Tests for mail_export function."""
 
@@ -186,6 +372,36 @@ class TestMailExport:
         # Should send separate emails for each recipient
         assert len(mail.outbox) == export.recipients.count()
 
+    def test_mail_export_send_separately_builds_message_once(self, export, exporter_class, mock_storage, mock_email_backend, other_user, superuser):
+        """Test message is rendered and encoded once and sent to every recipient over one connection."""
+        from django.core.mail import get_connection
+        from outputs.usecases import get_attachment
+
+        export.send_separately = True
+        export.total = 1
+        export.recipients.add(other_user, superuser)
+        export.save()
+
+        exporter = exporter_class(user=export.creator, recipients=export.recipients.all())
+        exporter.get_message_body = Mock(return_value='Test body')
+        connections = []
+
+        def connection(**kwargs):
+            connections.append(get_connection(**kwargs))
+            return connections[-1]
+
+        with patch.object(type(export), 'exporter', new_callable=lambda: property(lambda self: exporter)), \
+             patch('outputs.usecases.get_attachment', wraps=get_attachment) as mock_attachment, \
+             patch('outputs.usecases.get_connection', side_effect=connection):
+            mail_successful_export(export, filename='test.xlsx')
+
+        assert exporter.get_message_body.call_count == 1
+        assert mock_attachment.call_count == 1
+        assert len(connections) == 1
+        assert sorted(message.to[0] for message in mail.outbox) == sorted(export.recipients_emails)
+        assert all(len(message.to) == 1 for message in mail.outbox)
+        assert all(message.attachments[0].get_payload(decode=True) == b'test export content' for message in mail.outbox)
+
     def test_mail_export_send_together(self, export, exporter_class, mock_storage, mock_email_backend):
         """Test sending email together."""
         export.send_separately = False
@@ -262,9 +478,76 @@ class TestMailExport:
         assert ExportItem.objects.filter(export=export).count() == 1
 
 
+    def test_mail_export_streams_output_file(self, export, exporter_class, mock_storage, mock_email_backend):
+        """Test output file is saved to storage and attached without reading it by get_output()."""
+        import io
+
+        export.send_separately = False
+        content = bytes(range(256)) * 10
+        output_file = io.BytesIO(content)
+
+        exporter = exporter_class(user=export.creator, recipients=export.recipients.all())
+        exporter.get_output = Mock(side_effect=AssertionError('output should not be copied'))
+        exporter.get_message_body = Mock(return_value='Test body')
+
+        def save(name, file):
+            assert file.read() == content
+            return name
+
+        mock_storage.save.side_effect = save
+
+        with patch('outputs.usecases.outputs_settings.SAVE_AS_FILE', True):
+            with patch.object(type(export), 'exporter', new_callable=lambda: property(lambda self: exporter)):
+                mail_successful_export(export, filename='test.xlsx', output_file=output_file)
+
+        assert mock_storage.save.call_args[0][0] == 'exports/test.xlsx'
+        assert len(mail.outbox) == 1
+
+
+class TestGetAttachment:
+    """Tests for get_attachment function."""
+
+    def test_get_attachment_encodes_file_by_chunks(self):
+        """Test attachment encoded by chunks decodes to the file content."""
+        import io
+
+        content = bytes(range(256)) * 40
+
+        with patch('outputs.usecases.ATTACHMENT_READ_SIZE', 57 * 3):
+            attachment = get_attachment(io.BytesIO(content), 'test.xlsx', 'application/vnd.ms-excel')
+
+        assert attachment.get_content_type() == 'application/vnd.ms-excel'
+        assert attachment.get_filename() == 'test.xlsx'
+        assert attachment.get_payload(decode=True) == content
+        assert all(len(line) <= 76 for line in attachment.get_payload().splitlines())
+
+    def test_get_attachment_bytes_and_unicode_filename(self):
+        """Test bytes are accepted and non-ascii filename is encoded."""
+        attachment = get_attachment(b'test content', 'prehľad.csv', 'text/csv')
+
+        assert attachment.get_payload(decode=True) == b'test content'
+        assert attachment.get_filename() == 'prehľad.csv'
+
+
 class TestGetMessage:
     """Tests for get_message function."""
 
+    def test_get_message_with_compressed_attachment(self):
+        """Test compressed output is attached with adjusted filename and content type."""
+        import gzip
+        from outputs.mixins import ExporterMixin
+
+        exporter = ExporterMixin(user=None, recipients=[], filename='test.csv', compression='gzip')
+        exporter.output.write(b'test content')
+        exporter.get_message_body = Mock(return_value='Test body')
+
+        message = get_message(exporter, count=1, recipient_list=['test@example.com'], subject='Test Export')
+
+        attachment = message.attachments[0]
+        assert attachment.get_filename() == 'test.csv.gz'
+        assert attachment.get_content_type() == 'application/gzip'
+        assert gzip.decompress(attachment.get_payload(decode=True)) == b'test content'
+
     def test_get_message_with_attachment(self, exporter_class):
         """Test message with attachment."""
         exporter = exporter_class(user=None, recipients=[])
@@ -330,3 +613,296 @@ class TestGetMessage:
         assert message.alternatives
         assert message.alternatives[0][0] == '<html>Test body</html>'
 
+
+
+class TestShardedExport:
+    """Tests for exports split into parts written by multiple jobs (shards) or by one job with checkpoints and merged."""
+
+    def get_csv_exporter_class(self, function=None):
+        from outputs.mixins import CsvExporterMixin
+
+        class ShardedCsvExporter(CsvExporterMixin):
+            queryset = SampleModel.objects.order_by('pk')
+            filename = 'test.csv'
+            shard_size = 3
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20, None, function)] if function else [('name', 'Name', 20)]}
+
+        return ShardedCsvExporter
+
+    def get_excel_exporter_class(self):
+        from outputs.mixins import ExcelExporterMixin
+
+        class ShardedExcelExporter(ExcelExporterMixin):
+            queryset = SampleModel.objects.order_by('pk')
+            filename = 'test.xlsx'
+            shard_size = 3
+
+            def get_worksheet_title(self, index=0):
+                return 'Test'
+
+            @staticmethod
+            def selectable_fields():
+                return {'group1': [('name', 'Name', 20), ('created', 'Created', 15, 'datetime')]}
+
+        return ShardedExcelExporter
+
+    def run_export(self, exporter_class, user, filename=None):
+        """Run export job with all dispatched jobs executed synchronously."""
+        from outputs.jobs import execute_export
+        from outputs.utils import serialize_exporter_params
+
+        from django.utils.module_loading import import_string
+
+        def dispatch(task, *args, **kwargs):
+            return task(*args, **kwargs)
+
+        def import_class(path):
+            return exporter_class if path == exporter_class.get_path() else import_string(path)
+
+        params = serialize_exporter_params({
+            'user': user, 'recipients': [user], 'filename': filename or exporter_class.filename
+        })
+
+        with patch('outputs.models.dispatch_task', side_effect=dispatch), \
+             patch('outputs.jobs.get_exporter_class', side_effect=import_class), \
+             patch.object(Export, 'exporter_class', new_callable=PropertyMock(return_value=exporter_class)), \
+             patch('outputs.jobs.export_shard', wraps=export_shard) as mock_export_shard:
+            execute_export(exporter_class.get_path(), params, 'en')
+
+        return Export.objects.latest('pk'), mock_export_shard
+
+    def test_get_shard_ranges(self, user, content_type):
+        objects = [SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com') for i in range(7)]
+        exporter_class = self.get_csv_exporter_class()
+        exporter = exporter_class(user=user, recipients=[])
+        export = exporter.save_export()
+
+        assert get_shard_ranges(export, exporter) == [
+            (objects[0].pk, objects[3].pk),
+            (objects[3].pk, objects[6].pk),
+            (objects[6].pk, None),
+        ]
+
+        exporter.queryset = SampleModel.objects.order_by('-pk')
+        assert get_shard_ranges(export, exporter)[0] == (objects[6].pk, None)
+
+        # order of custom ordering can't be kept by parts
+        exporter.queryset = SampleModel.objects.order_by('name')
+        assert get_shard_ranges(export, exporter) == []
+
+        exporter.queryset = SampleModel.objects.order_by('pk')
+        exporter.shard_size = 7
+        assert get_shard_ranges(export, exporter) == []
+
+        exporter.shard_size = None
+        assert get_shard_ranges(export, exporter) == []
+
+    def test_sharded_csv_export(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test shards write parts merged into single output in the order of objects."""
+        from django.core.files.storage import default_storage
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        export, mock_export_shard = self.run_export(self.get_csv_exporter_class(), user)
+
+        assert mock_export_shard.call_count == 3
+        assert export.status == Export.STATUS_FINISHED
+        assert (export.shards_total, export.shards_finished) == (3, 3)
+        assert export.items.filter(result='SUCCESS').count() == 7
+
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_filename() == 'test.csv'
+        assert attachment.get_payload(decode=True).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(7)]
+
+        # parts are deleted after merge
+        assert default_storage.listdir(f'exports/parts/{export.pk}')[1] == []
+
+    @pytest.mark.parametrize('shard_size', [3, None])
+    def test_compressed_export_member_name(self, shard_size, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test compressed output contains file of the requested filename, not of the exporter class."""
+        import io
+        import zipfile
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        exporter_class = type(
+            'CompressedCsvExporter', (self.get_csv_exporter_class(),), {'shard_size': shard_size, 'compression': 'zip'}
+        )
+        export, mock_export_shard = self.run_export(exporter_class, user, filename='report.csv')
+
+        assert mock_export_shard.called == bool(shard_size)
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_filename() == 'report.csv.zip'
+
+        with zipfile.ZipFile(io.BytesIO(attachment.get_payload(decode=True))) as archive:
+            assert archive.namelist() == ['report.csv']
+
+    def test_sharded_export_of_custom_queryset(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test exporter selecting its objects by get_queryset() isn't sharded, so objects are written once."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        class CustomQuerysetCsvExporter(self.get_csv_exporter_class()):
+            def get_queryset(self):
+                return SampleModel.objects.order_by('pk')
+
+        export, mock_export_shard = self.run_export(CustomQuerysetCsvExporter, user)
+
+        assert mock_export_shard.call_count == 0
+        assert export.status == Export.STATUS_FINISHED
+        assert export.shards_total == 0
+
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_payload(decode=True).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(7)]
+
+    def test_sharded_excel_export(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test rows of Excel parts are written into single workbook."""
+        import io
+        import zipfile
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        export, mock_export_shard = self.run_export(self.get_excel_exporter_class(), user)
+
+        assert mock_export_shard.call_count == 3
+        assert export.status == Export.STATUS_FINISHED
+
+        output = mail.outbox[0].attachments[0].get_payload(decode=True)
+
+        with zipfile.ZipFile(io.BytesIO(output)) as archive:
+            shared_strings = archive.read('xl/sharedStrings.xml').decode()
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+
+        positions = [shared_strings.index(f'Test{i}<') for i in range(7)]
+        assert positions == sorted(positions)
+        assert '<row r="8"' in sheet
+        assert '<row r="9"' not in sheet
+
+    def test_sharded_export_failure(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test failed shard fails the whole export, later shards are skipped and nothing is merged."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        def fail(value):
+            if value == 'Test4':
+                raise ValueError('broken value')
+            return value
+
+        exporter_class = self.get_csv_exporter_class(fail)
+
+        with patch('outputs.usecases.notify_about_failed_export') as mock_notify:
+            with pytest.raises(ValueError):
+                self.run_export(exporter_class, user)
+
+        export = Export.objects.latest('pk')
+        assert export.status == Export.STATUS_FAILED
+        assert export.shards_finished == 1
+        assert export.items.filter(result='FAILURE').count() == 7
+        assert mock_notify.call_count == 1
+        assert len(mail.outbox) == 0
+
+        # remaining shard of failed export doesn't write its part
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock(return_value=exporter_class)):
+            export_shard(export, 2, export.items.order_by('-object_id').first().object_id, None, 'en')
+
+        export.refresh_from_db()
+        assert export.shards_finished == 1
+
+    def get_checkpointed_csv_exporter_class(self, function=None):
+        exporter_class = self.get_csv_exporter_class(function)
+        return type('CheckpointedCsvExporter', (exporter_class,), {'shard_size': None, 'checkpoint_size': 3})
+
+    def test_checkpointed_csv_export(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test single job writes parts recording a checkpoint after each of them and merges them."""
+        from django.core.files.storage import default_storage
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        with patch('outputs.usecases.write_part', wraps=write_part) as mock_write_part:
+            export, mock_export_shard = self.run_export(self.get_checkpointed_csv_exporter_class(), user)
+
+        assert mock_export_shard.call_count == 0
+        assert mock_write_part.call_count == 3
+        assert export.status == Export.STATUS_FINISHED
+        assert (export.shards_total, export.shards_finished) == (3, 3)
+
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_payload(decode=True).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(7)]
+        assert default_storage.listdir(f'exports/parts/{export.pk}')[1] == []
+
+    def test_checkpointed_export_of_custom_queryset(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test exporter selecting its objects by get_queryset() isn't checkpointed, so objects are written once."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        class CustomQuerysetCsvExporter(self.get_checkpointed_csv_exporter_class()):
+            def get_queryset(self):
+                return SampleModel.objects.order_by('pk')
+
+        with patch('outputs.usecases.write_part', wraps=write_part) as mock_write_part:
+            export, mock_export_shard = self.run_export(CustomQuerysetCsvExporter, user)
+
+        assert mock_write_part.call_count == 0
+        assert export.status == Export.STATUS_FINISHED
+        assert export.shards_total == 0
+
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_payload(decode=True).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(7)]
+
+    def test_checkpointed_export_resumes(self, user, content_type, mock_email_backend, settings, tmp_path):
+        """Test retried job continues after the last checkpoint without writing finished parts again."""
+        from outputs.jobs import mail_export_by_id
+
+        settings.MEDIA_ROOT = str(tmp_path)
+        for i in range(7):
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+
+        attempts = []
+
+        def fail_once(value):
+            # first attempt dies in the middle of the second part
+            if value == 'Test4' and not attempts:
+                attempts.append(value)
+                raise TimeoutError('job timeout')
+            return value
+
+        exporter_class = self.get_checkpointed_csv_exporter_class(fail_once)
+
+        with patch('outputs.usecases.notify_about_failed_export'):
+            with pytest.raises(TimeoutError):
+                self.run_export(exporter_class, user)
+
+        export = Export.objects.latest('pk')
+        assert export.status == Export.STATUS_FAILED
+        assert (export.shards_total, export.shards_finished) == (3, 1)
+        # items keep their detail, the error is only notified
+        assert not export.items.filter(detail='job timeout').exists()
+
+        with patch.object(Export, 'exporter_class', new_callable=PropertyMock(return_value=exporter_class)), \
+             patch('outputs.usecases.write_part', wraps=write_part) as mock_write_part:
+            mail_export_by_id(export.pk, 'outputs.models.Export', 'en', 'test.csv')
+
+        assert [call.args[1] for call in mock_write_part.call_args_list] == [1, 2]
+
+        export.refresh_from_db()
+        assert export.status == Export.STATUS_FINISHED
+        assert export.shards_finished == 3
+        assert export.items.filter(result='SUCCESS').count() == 7
+        assert sorted(export.items.values_list('detail', flat=True)) == sorted(str(obj) for obj in SampleModel.objects.all())
+
+        attachment = mail.outbox[0].attachments[0]
+        assert attachment.get_payload(decode=True).decode().splitlines() == ['Name'] + [f'Test{i}' for i in range(7)]
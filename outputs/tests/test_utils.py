@@ -0,0 +1,137 @@
+"""
+Tests for utils.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from outputs.utils import compress_chunks, get_keyset_ordering, queryset_chunks
+from outputs.tests.models import SampleModel
+
+
+class TestQuerysetChunks:
+    """Tests for get_keyset_ordering / queryset_chunks."""
+
+    def create_objects(self, count):
+        return [
+            SampleModel.objects.create(name=f'Test{i}', email=f'test{i}@example.com')
+            for i in range(count)
+        ]
+
+    def test_get_keyset_ordering(self):
+        assert get_keyset_ordering(SampleModel.objects.all()) == 'pk'
+        assert get_keyset_ordering(SampleModel.objects.order_by('id')) == 'pk'
+        assert get_keyset_ordering(SampleModel.objects.order_by('-pk')) == '-pk'
+        assert get_keyset_ordering(SampleModel.objects.order_by('name')) is None
+        assert get_keyset_ordering(SampleModel.objects.order_by('pk', 'name')) is None
+        assert get_keyset_ordering(SampleModel.objects.values('pk')) is None
+        assert get_keyset_ordering(SampleModel.objects.all()[:5]) is None
+
+    def test_queryset_chunks_seeks_by_pk(self):
+        objects = self.create_objects(7)
+
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(queryset_chunks(SampleModel.objects.all(), 3))
+
+        assert [[obj.pk for obj in chunk] for chunk in chunks] == [
+            [obj.pk for obj in objects[0:3]],
+            [obj.pk for obj in objects[3:6]],
+            [obj.pk for obj in objects[6:7]],
+        ]
+        assert len(queries) == 3
+        assert all('OFFSET' not in query['sql'] for query in queries)
+        assert all('COUNT' not in query['sql'] for query in queries)
+        assert '"id" >' in queries[-1]['sql']
+
+    def test_queryset_chunks_seeks_by_pk_descending(self):
+        objects = self.create_objects(5)
+
+        chunks = list(queryset_chunks(SampleModel.objects.order_by('-pk'), 2))
+
+        assert [obj.pk for chunk in chunks for obj in chunk] == [obj.pk for obj in reversed(objects)]
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_queryset_chunks_exact_multiple(self):
+        self.create_objects(6)
+
+        chunks = list(queryset_chunks(SampleModel.objects.all(), 3))
+
+        assert [len(chunk) for chunk in chunks] == [3, 3]
+
+    def test_queryset_chunks_empty(self):
+        assert list(queryset_chunks(SampleModel.objects.all(), 3)) == []
+
+    def test_queryset_chunks_keeps_custom_ordering(self):
+        objects = self.create_objects(5)
+
+        chunks = list(queryset_chunks(SampleModel.objects.order_by('-name'), 2))
+
+        assert [obj.pk for chunk in chunks for obj in chunk] == [obj.pk for obj in reversed(objects)]
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_queryset_chunks_custom_ordering_uses_cursor(self):
+        self.create_objects(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(queryset_chunks(SampleModel.objects.order_by('name'), 2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert all('OFFSET' not in query['sql'] for query in queries)
+
+    def test_queryset_chunks_prefetch_related(self, django_assert_num_queries):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group
+
+        User = get_user_model()
+        group = Group.objects.create(name='group')
+
+        for i in range(5):
+            User.objects.create(username=f'user{i}').groups.add(group)
+
+        for queryset in [User.objects.prefetch_related('groups'), User.objects.prefetch_related('groups').order_by('username')]:
+            chunks = list(queryset_chunks(queryset, 2))
+
+            with django_assert_num_queries(0):
+                assert all(list(user.groups.all()) == [group] for chunk in chunks for user in chunk)
+
+
+class TestCompressChunks:
+    """Tests for compress_chunks."""
+
+    chunks = [b'header\n'] + [f'row {i}\n'.encode() * 100 for i in range(50)]
+
+    def test_compress_chunks_gzip(self):
+        import gzip
+
+        compressed = b''.join(compress_chunks(iter(self.chunks), 'gzip', 'test.csv'))
+
+        assert gzip.decompress(compressed) == b''.join(self.chunks)
+        assert len(compressed) < len(b''.join(self.chunks))
+
+    def test_compress_chunks_zip(self):
+        import io
+        import zipfile
+
+        compressed = b''.join(compress_chunks(iter(self.chunks), 'zip', 'test.csv'))
+
+        with zipfile.ZipFile(io.BytesIO(compressed)) as archive:
+            assert archive.namelist() == ['test.csv']
+            assert archive.read('test.csv') == b''.join(self.chunks)
+
+    def test_compress_chunks_is_lazy(self):
+        consumed = []
+
+        def chunks():
+            for chunk in self.chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        compressed = compress_chunks(chunks(), 'zip', 'test.csv')
+        next(compressed)
+
+        assert len(consumed) < len(self.chunks)
+
+    def test_compress_chunks_unsupported(self):
+        import pytest
+
+        with pytest.raises(ValueError):
+            list(compress_chunks(iter(self.chunks), 'rar', 'test.csv'))
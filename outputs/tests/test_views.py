@@ -1,6 +1,8 @@
 """
 Tests for views.
 """
+from unittest.mock import patch
+
 from django.urls import reverse
 
 from outputs.models import Export, Scheduler
@@ -38,6 +40,39 @@ class TestExportListView:
         assert response.status_code in [302, 403]
 
 
+class TestExportProgressView:
+    """Tests for ExportProgressView."""
+
+    def test_export_progress_view_get(self, client, user_with_perms, export):
+        """Test progress is returned as JSON."""
+        Export.objects.filter(pk=export.pk).update(status=Export.STATUS_PROCESSING, processed=5)
+        client.force_login(user_with_perms)
+        url = reverse('outputs:export_progress', args=[export.pk])
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json() == {
+            'status': Export.STATUS_PROCESSING, 'processed': 5, 'total': 10, 'percent': 50, 'eta': None
+        }
+
+    def test_export_progress_view_permissions(self, client, user, export):
+        """Test permissions."""
+        url = reverse('outputs:export_progress', args=[export.pk])
+        response = client.get(url)
+        assert response.status_code in [302, 403]
+
+    def test_export_progress_view_of_other_user(self, client, other_user, superuser, export):
+        """Test progress of export created by another user is returned only to superuser."""
+        from django.contrib.auth.models import Permission
+        other_user.user_permissions.set(Permission.objects.filter(codename='list_export'))
+        url = reverse('outputs:export_progress', args=[export.pk])
+
+        client.force_login(other_user)
+        assert client.get(url).status_code == 404
+
+        client.force_login(superuser)
+        assert client.get(url).status_code == 200
+
+
 class TestSchedulerListView:
     """Tests for SchedulerListView."""
 
@@ -48,6 +83,18 @@ class TestSchedulerListView:
         response = client.get(url)
         assert response.status_code == 200
 
+    def test_scheduler_list_view_prefetches_schedules(self, client, user_with_perms, scheduler):
+        """Cron jobs of the whole page are resolved at once."""
+        client.force_login(user_with_perms)
+        url = reverse('outputs:scheduler_list')
+
+        with patch.object(Scheduler, 'prefetch_schedules') as mock_prefetch:
+            response = client.get(url)
+
+        assert response.status_code == 200
+        mock_prefetch.assert_called_once()
+        assert list(mock_prefetch.call_args[0][0]) == [scheduler]
+
     def test_scheduler_list_view_filtering(self, client, user_with_perms, scheduler):
         """Test filtering."""
         client.force_login(user_with_perms)
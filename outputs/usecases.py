@@ -1,12 +1,23 @@
+import base64
+import copy
+import hashlib
+import itertools
+import json
 import logging
+import tempfile
+import time
+from email.mime.base import MIMEBase
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
-from django.core.mail import EmailMultiAlternatives
-from django.db.models import Q
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError
+from django.db.models import F, Q, Sum
+from django.http import QueryDict
 from django.utils import translation
+from django.utils.timezone import now
 
 from outputs import settings as outputs_settings
 
@@ -20,50 +31,450 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# bytes read from export file at once when encoding attachment, multiple of 57 bytes encoded to one line of base64
+ATTACHMENT_READ_SIZE = 57 * 16 * 1024
+
+
+class ExportProgress(object):
+    """
+    Counter of objects written by the exporter, added to Export.processed at most once per PROGRESS_INTERVAL seconds.
+
+    Exporters report written objects by batches (see ExporterMixin.report_progress()), so tracking doesn't cost
+    anything per row and shards of the same export add to the same counter.
+    """
+    def __init__(self, export, interval=None):
+        self.export = export
+        self.interval = outputs_settings.PROGRESS_INTERVAL if interval is None else interval
+        self.pending = 0
+        self.flushed = time.monotonic()
+
+    def add(self, count):
+        self.pending += count
+
+        if time.monotonic() - self.flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        from outputs.models import Export
+
+        if self.pending:
+            Export.objects.filter(pk=self.export.pk).update(processed=F('processed') + self.pending)
+            self.pending = 0
+
+        self.flushed = time.monotonic()
+
 
 def export_items(export, language, filename=None):
     """
     Process export items and generate export file.
-    
-    Uses database transactions to ensure data consistency.
-    Updates ExportItem status based on export success/failure.
+
+    The output is loaded from cache, written by checkpointed parts (export_parts) or by the exporter at once;
+    finish_export and fail_export then update status of the export and its items.
     """
-    from django.db import transaction
-    from outputs.models import Export, ExportItem
+    from outputs.models import Export
 
     logger.info(
         f"Processing export items: export_id={export.id}, "
         f"content_type={export.content_type}, total_items={export.total}"
     )
 
-    export.status = Export.STATUS_PROCESSING
-    export.save(update_fields=['status'])
-
     # set language
     translation.activate(language)
 
+    exporter = get_output_exporter(export, filename)
+    cache_key = get_output_cache_key(export, exporter)
+    cached_output = get_cached_output(cache_key)
+
+    if cached_output is not None:
+        logger.info(f"Export output loaded from cache: export_id={export.id}, key={cache_key}")
+        export.status = Export.STATUS_PROCESSING
+        export.started = now()
+        export.save(update_fields=['status', 'started'])
+        finish_export(export, exporter, lambda: load_cached_output(exporter, cached_output), filename)
+        return
+
+    part_ranges = get_checkpoint_ranges(export, exporter)
+
+    # parts committed by a previous attempt of the same export are not exported again
+    if part_ranges and export.shards_total == len(part_ranges):
+        parts_finished = export.shards_finished
+    else:
+        parts_finished = 0
+
+    export.status = Export.STATUS_PROCESSING
+    export.processed = min(parts_finished * exporter.checkpoint_size, export.total) if parts_finished else 0
+    export.started = now()
+    export.shards_total = len(part_ranges)
+    export.shards_finished = parts_finished
+    export.save(update_fields=['status', 'processed', 'started', 'shards_total', 'shards_finished'])
+
+    if part_ranges:
+        if parts_finished:
+            logger.info(f"Export resumed: export_id={export.id}, parts_finished={parts_finished}")
+
+        export_parts(export, part_ranges, language, filename, cache_key)
+        return
+
+    exporter.progress = ExportProgress(export)
+    finish_export(export, exporter, exporter.export, filename, cache_key)
+
+
+def export_parts(export, part_ranges, language, filename=None, cache_key=None):
+    """
+    Write parts of the export one after another, recording a checkpoint after every written part, and merge them.
+
+    Parts written before the checkpoint (export.shards_finished) are skipped, so a retried job continues
+    where the previous attempt stopped.
+    """
+    try:
+        for part_index in range(export.shards_finished, len(part_ranges)):
+            first_id, next_id = part_ranges[part_index]
+            write_part(export, part_index, first_id, next_id)
+
+            export.shards_finished = part_index + 1
+            export.save(update_fields=['shards_finished'])
+    except Exception as e:
+        fail_export(export, str(e))
+        raise
+
+    merge_shards(export, language, filename, cache_key)
+
+
+def get_output_exporter(export, filename=None):
+    """
+    Return exporter of the export writing its output under the requested filename,
+    which also names the member of compressed output
+    """
     exporter = export.exporter
 
+    if filename:
+        exporter.filename = filename
+
+    return exporter
+
+
+def finish_export(export, exporter, write_output, filename=None, cache_key=None):
+    """
+    Write output of the exporter by write_output(), update status of the export and its items and mail the output.
+    The output is stored in the output cache under cache_key if it is set.
+    """
+    from django.db import transaction
+    from outputs.models import Export, ExportItem
+
     try:
+        # output is written outside of the transaction, so it can be formatted by worker processes
+        # with their own database connections (see ExcelExporterMixin.use_processes())
+        write_output()
+
+        progress = getattr(exporter, 'progress', None)
+        if progress is not None:
+            progress.flush()
+
+        if cache_key is not None:
+            store_cached_output(cache_key, exporter.get_output_file())
+
         with transaction.atomic():
-            exporter.export()
             export.status = Export.STATUS_FINISHED
             export.save(update_fields=['status'])
+            update_scheduler_execution(export)
             updated_count = export.update_export_items_result(ExportItem.RESULT_SUCCESS)
             logger.info(
                 f"Updated {updated_count} ExportItem records to SUCCESS for export_id={export.id}"
             )
-        mail_successful_export(export, filename, exporter.get_output())
+        mail_successful_export(export, filename, exporter.get_output_file())
     except Exception as e:
+        fail_export(export, str(e))
+        raise
+
+
+def fail_export(export, error_detail):
+    """
+    Mark export and its items as failed and notify about it, only once if export is processed by multiple shards
+    """
+    from django.db import transaction
+    from outputs.models import Export, ExportItem
+
+    with transaction.atomic():
+        updated = Export.objects.filter(pk=export.pk).exclude(status=Export.STATUS_FAILED).update(status=Export.STATUS_FAILED)
+        export.status = Export.STATUS_FAILED
+
+        if not updated:
+            return
+
+        # detail of items (str(obj)) is kept, so a retried export finished later doesn't show the error,
+        # which is reported by notify_about_failed_export()
+        updated_count = export.update_export_items_result(ExportItem.RESULT_FAILURE)
+        logger.info(
+            f"Updated {updated_count} ExportItem records to FAILURE for export_id={export.id}"
+        )
+        update_scheduler_execution(export)
+    notify_about_failed_export(export, error_detail)
+
+
+def update_scheduler_execution(export):
+    """
+    Record status of the finished or failed export in execution of its scheduler
+    """
+    if export.scheduler_id is None:
+        return
+
+    from outputs.models import SchedulerExecution
+    SchedulerExecution.objects.filter(export=export).update(
+        status=export.status, total=export.total, started=export.started, finished=now()
+    )
+
+
+def get_output_cache_key(export, exporter):
+    """
+    Return key of the output of the export in the output cache, or None if the output isn't going to be cached.
+
+    The key is a digest of exporter path, normalized params, selected fields, active language, compression
+    (and filename of compressed output), exported objects (in their order) and data version of the exporter (see ExporterMixin.get_cache_version()),
+    so exports share their outputs only if they export the same data of the same objects in the same way.
+    """
+    if not outputs_settings.OUTPUT_CACHE_TTL or not getattr(exporter, 'cache_output', False):
+        return None
+
+    version = exporter.get_cache_version()
+
+    if version is None:
+        return None
+
+    params = QueryDict(export.query_string)
+    object_ids = export.items.order_by('pk').values_list('object_id', flat=True).iterator(
+        chunk_size=outputs_settings.CHUNK_SIZE
+    )
+
+    digest = hashlib.sha256(json.dumps([
+        export.exporter_path,
+        sorted((key, params.getlist(key)) for key in params.keys()),
+        export.fields,
+        translation.get_language(),
+        exporter.compression,
+        # compressed output contains file of the requested name
+        exporter.filename if exporter.compression else None,
+        str(version),
+    ]).encode())
+
+    for chunk in iter(lambda: list(itertools.islice(object_ids, outputs_settings.CHUNK_SIZE)), []):
+        digest.update(','.join(map(str, chunk)).encode())
+        digest.update(b',')
+
+    return digest.hexdigest()
+
+
+def get_cached_output(cache_key):
+    """
+    Return CachedOutput stored under cache_key within OUTPUT_CACHE_TTL seconds or None
+    """
+    from datetime import timedelta
+    from outputs.models import CachedOutput
+
+    if cache_key is None:
+        return None
+
+    cached_output = CachedOutput.objects.filter(key=cache_key).first()
+
+    if cached_output is None:
+        return None
+
+    if cached_output.created < now() - timedelta(seconds=outputs_settings.OUTPUT_CACHE_TTL):
+        cached_output.delete()
+        return None
+
+    # least recently used outputs are evicted first
+    CachedOutput.objects.filter(pk=cached_output.pk).update(used=now())
+    return cached_output
+
+
+def load_cached_output(exporter, cached_output):
+    with default_storage.open(cached_output.path) as output_file:
+        exporter.load_output(output_file)
+
+
+def store_cached_output(cache_key, output_file):
+    """
+    Store output into the output cache and evict expired and least recently used outputs
+    over OUTPUT_CACHE_MAX_SIZE bytes
+    """
+    from datetime import timedelta
+    from django.db import transaction
+    from outputs.models import CachedOutput
+
+    size = output_file.seek(0, 2)
+    output_file.seek(0)
+
+    if size > outputs_settings.OUTPUT_CACHE_MAX_SIZE:
+        return
+
+    path = default_storage.save(f'exports/cache/{cache_key}', File(output_file, name=cache_key))
+
+    try:
         with transaction.atomic():
-            export.status = Export.STATUS_FAILED
-            export.save(update_fields=['status'])
-            updated_count = export.update_export_items_result(ExportItem.RESULT_FAILURE, detail=str(e))
-            logger.info(
-                f"Updated {updated_count} ExportItem records to FAILURE for export_id={export.id}"
-            )
-        notify_about_failed_export(export, str(e))
+            CachedOutput.objects.create(key=cache_key, path=path, size=size)
+    except IntegrityError:
+        # stored by identical export in the meantime
+        default_storage.delete(path)
+        return
+
+    expired = CachedOutput.objects.filter(created__lt=now() - timedelta(seconds=outputs_settings.OUTPUT_CACHE_TTL))
+
+    for cached_output in expired:
+        cached_output.delete()
+
+    total_size = CachedOutput.objects.aggregate(total_size=Sum('size'))['total_size'] or 0
+
+    for cached_output in CachedOutput.objects.order_by('used'):
+        if total_size <= outputs_settings.OUTPUT_CACHE_MAX_SIZE:
+            break
+
+        total_size -= cached_output.size
+        cached_output.delete()
+
+
+def get_shard_ranges(export, exporter):
+    """
+    Return list of (first object id, first object id of the next shard or None) ranges of at most
+    exporter.shard_size exported objects, or empty list if the export isn't going to be sharded.
+    """
+    return get_part_ranges(export, exporter, exporter.shard_size)
+
+
+def get_checkpoint_ranges(export, exporter):
+    """
+    Return list of (first object id, first object id of the next part or None) ranges of at most
+    exporter.checkpoint_size exported objects, or empty list if the export isn't going to be checkpointed.
+    """
+    return get_part_ranges(export, exporter, getattr(exporter, 'checkpoint_size', None))
+
+
+def get_part_ranges(export, exporter, size):
+    """
+    Return list of (first object id, first object id of the next part or None) ranges of at most size exported objects,
+    or empty list if the export isn't going to be split into parts.
+
+    Ranges are computed from the export items, so they are the same for every attempt of the export.
+    Only exports ordered by primary key are split, so the parts keep the order of the objects.
+    Exporters selecting their objects by overridden methods are never split, because they would ignore
+    the queryset of the part and write all objects in every part.
+    """
+    from outputs.utils import get_keyset_ordering
+
+    if not size or not exporter.supports_parts or export.total <= size:
+        return []
+
+    if exporter.customizes_queryset():
+        return []
+
+    ordering = get_keyset_ordering(exporter.get_queryset())
+
+    if ordering is None:
+        return []
+
+    object_ids = export.items.order_by('object_id').values_list('object_id', flat=True)
+    first_ids = [
+        object_id for index, object_id in enumerate(object_ids.iterator(chunk_size=outputs_settings.CHUNK_SIZE))
+        if index % size == 0
+    ]
+    part_ranges = list(zip(first_ids, first_ids[1:] + [None]))
+
+    if ordering == '-pk':
+        part_ranges.reverse()
+
+    return part_ranges
+
+
+def export_shard(export, shard_index, first_id, next_id, language, filename=None):
+    """
+    Write part of the export with objects of the range of primary keys into the storage,
+    the last finished shard dispatches merge of the parts
+    """
+    from django.db import transaction
+    from outputs.models import Export
+
+    Export.objects.filter(pk=export.pk, status=Export.STATUS_PENDING).update(
+        status=Export.STATUS_PROCESSING, processed=0, started=now()
+    )
+    export.refresh_from_db(fields=['status'])
+
+    if export.status == Export.STATUS_FAILED:
+        logger.info(f"Skipping shard of failed export: export_id={export.id}, shard_index={shard_index}")
+        return
+
+    # set language
+    translation.activate(language)
+
+    try:
+        write_part(export, shard_index, first_id, next_id)
+
+        with transaction.atomic():
+            export = Export.objects.select_for_update().get(pk=export.pk)
+            export.shards_finished += 1
+            export.save(update_fields=['shards_finished'])
+    except Exception as e:
+        fail_export(export, str(e))
         raise
+
+    logger.info(
+        f"Export shard finished: export_id={export.id}, shard_index={shard_index}, "
+        f"shards_finished={export.shards_finished}, shards_total={export.shards_total}"
+    )
+
+    if export.shards_finished == export.shards_total:
+        export.send_merge(language, filename)
+
+
+def write_part(export, part_index, first_id, next_id):
+    """
+    Write part of the export with objects of the range of primary keys into the storage
+    """
+    queryset = export.object_list.filter(pk__gte=first_id)
+    if next_id is not None:
+        queryset = queryset.filter(pk__lt=next_id)
+
+    exporter = export.get_exporter(queryset=queryset)
+    exporter.progress = ExportProgress(export)
+    part_path = export.get_shard_part_path(part_index)
+
+    with tempfile.SpooledTemporaryFile(max_size=outputs_settings.SPOOL_MAX_SIZE) as part:
+        exporter.export_part(part)
+        exporter.progress.flush()
+        part.seek(0)
+
+        # part of retried shard is replaced
+        default_storage.delete(part_path)
+        default_storage.save(part_path, File(part, name=part_path))
+
+
+def merge_shards(export, language, filename=None, cache_key=None):
+    """
+    Merge parts written by shards of the export into its output and mail it
+    """
+    from outputs.models import Export
+
+    if export.status == Export.STATUS_FAILED:
+        logger.info(f"Skipping merge of failed export: export_id={export.id}")
+        return
+
+    # set language
+    translation.activate(language)
+
+    exporter = get_output_exporter(export, filename)
+    part_paths = [export.get_shard_part_path(shard_index) for shard_index in range(export.shards_total)]
+
+    def merge_parts():
+        parts = [default_storage.open(part_path) for part_path in part_paths]
+
+        try:
+            exporter.merge_parts(parts)
+        finally:
+            for part in parts:
+                part.close()
+
+    finish_export(export, exporter, merge_parts, filename, cache_key)
+
+    for part_path in part_paths:
+        default_storage.delete(part_path)
            
 
 def notify_about_failed_export(export, error_detail):
@@ -95,16 +506,21 @@ def notify_about_failed_export(export, error_detail):
 
 
 def mail_successful_export(export, filename=None, output_file=None):
-    exporter = export.exporter
+    exporter = get_output_exporter(export, filename)
+
+    if output_file is None:
+        output_file = exporter.get_output_file()
+    elif isinstance(output_file, bytes):
+        output_file = ContentFile(output_file)
 
     if outputs_settings.SAVE_AS_FILE:
         # Save the export using Django's default storage
-        output_filename = filename or exporter.get_filename()
+        output_filename = exporter.get_output_filename(filename)
         file_path = f'exports/{output_filename}'
 
-        # Save the file using default storage
-        file_content = ContentFile(output_file or exporter.get_output())
-        saved_path = default_storage.save(file_path, file_content)
+        # Save the file using default storage, it is read by chunks
+        output_file.seek(0)
+        saved_path = default_storage.save(file_path, File(output_file, name=output_filename))
         logger.info(f"Export file saved: export_id={export.id}, saved_path={saved_path}")
 
         # Get the full URL if the storage backend supports it
@@ -125,19 +541,26 @@ def mail_successful_export(export, filename=None, output_file=None):
             f"Sending export emails separately: export_id={export.id}, "
             f"recipients_count={len(export.recipients_emails)}"
         )
+        # render body and encode attachment once
+        message = get_message(
+            exporter,
+            count=num_items,
+            recipient_list=[],
+            subject='{}: {}'.format(_('Export'), verbose_name),
+            output_file=output_file,
+            filename=filename,
+            file_url=file_url
+        )
+
+        # shallow copies share the rendered body and encoded attachment, only recipient differs
+        messages = []
         for recipient in export.recipients_emails:
-            message = get_message(
-                exporter,
-                count=num_items,
-                recipient_list=[recipient],
-                subject='{}: {}'.format(_('Export'), verbose_name),
-                output_file=output_file,
-                filename=filename,
-                file_url=file_url
-            )
+            recipient_message = copy.copy(message)
+            recipient_message.to = [recipient]
+            messages.append(recipient_message)
 
-            # send
-            message.send(fail_silently=False)
+        # send all messages over single connection
+        get_connection(fail_silently=False).send_messages(messages)
 
     else:
         logger.info(
@@ -172,10 +595,43 @@ def get_message(exporter, count, recipient_list, subject, output_file=None, file
 
     if count > 0 and file_url is None:
         # get the stream and set the correct mimetype
-        message.attach(
-            filename or exporter.get_filename(),
-            output_file or exporter.get_output(),
-            exporter.content_type
-        )
+        message.attach(get_attachment(
+            output_file if output_file is not None else exporter.get_output_file(),
+            exporter.get_output_filename(filename),
+            exporter.get_output_content_type()
+        ))
+
+    return message
+
+
+def get_attachment(output_file, filename, content_type):
+    """
+    Return MIME attachment of the export file (file-like object or bytes).
+
+    File is base64 encoded by chunks, so the only copy of its content in memory is the encoded payload.
+    """
+    if isinstance(output_file, bytes):
+        output_file = ContentFile(output_file)
+
+    maintype, subtype = content_type.split('/', 1)
+    attachment = MIMEBase(maintype, subtype)
+
+    output_file.seek(0)
+    encoded_chunks = []
+
+    while True:
+        data = output_file.read(ATTACHMENT_READ_SIZE)
+        if not data:
+            break
+        encoded_chunks.append(base64.encodebytes(data).decode('ascii'))
+
+    attachment.set_payload(''.join(encoded_chunks))
+    attachment['Content-Transfer-Encoding'] = 'base64'
+
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        filename = ('utf-8', '', filename)
 
-    return message
\ No newline at end of file
+    attachment.add_header('Content-Disposition', 'attachment', filename=filename)
+    return attachment
\ No newline at end of file
@@ -1,3 +1,17 @@
+import base64
+import io
+import itertools
+import pickle
+import zipfile
+import zlib
+
+# compression: (filename extension, content type)
+COMPRESSION_FORMATS = {
+    'gzip': ('.gz', 'application/gzip'),
+    'zip': ('.zip', 'application/zip'),
+}
+
+
 def serialize_exporter_params(params: dict) -> dict:
     """
     Convert ORM objects in exporter_params to safe primitives for job queuing.
@@ -5,10 +19,13 @@ def serialize_exporter_params(params: dict) -> dict:
     Transforms:
       - ``user``       -> ``user_id`` (int | None)
       - ``recipients`` -> ``recipient_ids`` (list[int])
-      - ``queryset``   -> ``queryset_ids`` (list[int]) + ``queryset_model`` (dotted
-                          app_label.model_name), **only when a queryset is present**.
-                          When queryset is absent the keys are omitted entirely so
-                          the deserialized dict keeps the same shape the exporter
+      - ``queryset``   -> ``queryset_query`` (base64 encoded pickle of ``queryset.query``)
+                          + ``queryset_model`` (dotted app_label.model_name),
+                          **only when a queryset is present**. The queryset is not
+                          evaluated, so the payload size doesn't depend on the number
+                          of its rows and filters and ordering are re-applied by the
+                          worker. When queryset is absent the keys are omitted entirely
+                          so the deserialized dict keeps the same shape the exporter
                           constructor expects.
 
     All other keys are passed through unchanged (e.g. ``params``, ``filename``,
@@ -27,14 +44,18 @@ def serialize_exporter_params(params: dict) -> dict:
 
     # recipients (queryset or list of user objects)
     recipients = serialized.pop('recipients', [])
-    serialized['recipient_ids'] = [getattr(r, 'pk', r) for r in recipients]
+    if isinstance(recipients, QuerySet):
+        # primary keys only, users are not instantiated
+        serialized['recipient_ids'] = list(recipients.values_list('pk', flat=True))
+    else:
+        serialized['recipient_ids'] = [getattr(r, 'pk', r) for r in recipients]
 
     # queryset — only serialize when actually present; omit keys otherwise so
     # exporter constructors that don't accept queryset don't receive an
     # unexpected queryset=None kwarg.
     queryset = serialized.pop('queryset', None)
     if queryset is not None and isinstance(queryset, QuerySet):
-        serialized['queryset_ids'] = list(queryset.values_list('pk', flat=True))
+        serialized['queryset_query'] = base64.b64encode(pickle.dumps(queryset.query)).decode('ascii')
         serialized['queryset_model'] = (
             f"{queryset.model._meta.app_label}.{queryset.model._meta.model_name}"
         )
@@ -48,8 +69,10 @@ def deserialize_exporter_params(params: dict) -> dict:
     :func:`serialize_exporter_params`.
 
     Re-fetches ``user`` and ``recipients`` fresh from the database.
-    Rebuilds ``queryset`` as a ``pk__in`` queryset only when
-    ``queryset_ids`` / ``queryset_model`` keys are present in *params*.
+    Rebuilds ``queryset`` from its pickled query only when
+    ``queryset_query`` / ``queryset_model`` keys are present in *params*.
+    Payloads queued by older versions (``queryset_ids``) are rebuilt as
+    ``pk__in`` querysets keeping the order of the ids.
     """
     from django.apps import apps
     from django.contrib.auth import get_user_model
@@ -69,7 +92,16 @@ def deserialize_exporter_params(params: dict) -> dict:
 
 
     # queryset — only reconstruct when keys are present
-    if 'queryset_ids' in deserialized and 'queryset_model' in deserialized:
+    if 'queryset_query' in deserialized and 'queryset_model' in deserialized:
+        queryset_query = deserialized.pop('queryset_query')
+        queryset_model = deserialized.pop('queryset_model')
+        app_label, model_name = queryset_model.split('.')
+        model = apps.get_model(app_label, model_name)
+        queryset = model.objects.all()
+        queryset.query = pickle.loads(base64.b64decode(queryset_query))
+        deserialized['queryset'] = queryset
+
+    elif 'queryset_ids' in deserialized and 'queryset_model' in deserialized:
         queryset_ids = deserialized.pop('queryset_ids')
         queryset_model = deserialized.pop('queryset_model')
         app_label, model_name = queryset_model.split('.')
@@ -84,3 +116,142 @@ def deserialize_exporter_params(params: dict) -> dict:
     # If the keys are absent, 'queryset' is simply not included in the result.
 
     return deserialized
+
+
+def get_current_job_id():
+    """
+    Return ID of the RQ job being executed by this worker, or ``None`` outside of RQ jobs.
+
+    The ID is kept by retries of the job, so it identifies the export
+    created by any attempt of the job.
+    """
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return None
+
+    job = get_current_job()
+    return job.id if job is not None else None
+
+
+def get_keyset_ordering(queryset):
+    """
+    Return ``'pk'`` or ``'-pk'`` if *queryset* can be paginated by seeking its
+    primary key without changing the order of its rows, ``None`` otherwise.
+    """
+    from django.db.models.query import ModelIterable
+
+    if queryset.query.is_sliced or not issubclass(queryset._iterable_class, ModelIterable):
+        return None
+
+    ordering = queryset.query.order_by
+    if not ordering and queryset.query.default_ordering:
+        ordering = queryset.model._meta.ordering
+
+    if not ordering:
+        return 'pk'
+
+    if len(ordering) != 1 or not isinstance(ordering[0], str):
+        return None
+
+    descending = ordering[0].startswith('-')
+    pk = queryset.model._meta.pk
+
+    if ordering[0].lstrip('-') not in ('pk', pk.name, pk.attname):
+        return None
+
+    return '-pk' if descending else 'pk'
+
+
+def queryset_chunks(queryset, chunk_size):
+    """
+    Yield lists of at most *chunk_size* objects of *queryset*, in queryset order.
+
+    Querysets ordered by primary key (or not ordered at all) are paginated by
+    seeking (``pk > last_pk ORDER BY pk LIMIT n``), so every chunk costs the
+    same no matter how deep in the table it is and no ``COUNT`` is needed.
+    Other orderings can't be sought by primary key and are streamed from a
+    server-side cursor (``QuerySet.iterator()``, a named cursor on PostgreSQL).
+
+    Memory is bounded by *chunk_size* in both cases and ``prefetch_related()``
+    lookups of *queryset* are fetched for every chunk.
+    """
+    ordering = get_keyset_ordering(queryset)
+
+    if ordering is None:
+        objects = queryset.iterator(chunk_size=chunk_size)
+
+        while True:
+            chunk = list(itertools.islice(objects, chunk_size))
+
+            if not chunk:
+                return
+
+            yield chunk
+
+    queryset = queryset.order_by(ordering)
+    lookup = 'pk__lt' if ordering == '-pk' else 'pk__gt'
+    chunk = list(queryset[:chunk_size])
+
+    while chunk:
+        yield chunk
+
+        if len(chunk) < chunk_size:
+            return
+
+        chunk = list(queryset.filter(**{lookup: chunk[-1].pk})[:chunk_size])
+
+
+class StreamSink(io.RawIOBase):
+    """
+    Write-only, non-seekable stream collecting written bytes until they are popped
+    """
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def pop(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def compress_chunks(chunks, compression, filename):
+    """
+    Yield compressed data of *chunks* of bytes as they come, using ``'gzip'`` or ``'zip'`` *compression*.
+
+    Zip archive contains single member named *filename*, its sizes are written after the data
+    (data descriptor), so the archive doesn't need a seekable output.
+    """
+    if compression == 'gzip':
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        yield compressor.flush()
+
+    elif compression == 'zip':
+        sink = StreamSink()
+
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(filename, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.pop()
+                    if data:
+                        yield data
+
+        yield sink.pop()
+
+    else:
+        raise ValueError(f'Unsupported compression: {compression}')
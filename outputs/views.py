@@ -1,4 +1,5 @@
 from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, DeleteView
@@ -41,6 +42,25 @@ class ExportListView(LoginPermissionRequiredMixin, DisplayListViewMixin, Sorting
         return context_data
 
 
+class ExportProgressView(LoginPermissionRequiredMixin, DetailView):
+    """
+    JSON progress of the export created by the user, cheap enough to be polled while the export is processed
+    """
+    model = Export
+    permission_required = 'outputs.list_export'
+
+    def get_queryset(self):
+        queryset = self.model.objects.only('status', 'total', 'processed', 'started')
+
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(creator=self.request.user)
+
+        return queryset
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse(self.object.get_progress())
+
+
 class SchedulerListView(LoginPermissionRequiredMixin, DisplayListViewMixin, SortingListViewMixin, ListView):
     model = Scheduler
     filter_class = SchedulerFilter
@@ -65,6 +85,9 @@ class SchedulerListView(LoginPermissionRequiredMixin, DisplayListViewMixin, Sort
     def get_context_data(self, **kwargs):
         context_data = super().get_context_data(**kwargs)
         context_data.update({'filter': self.filter})
+
+        # resolve cron jobs of the whole page at once
+        Scheduler.prefetch_schedules(context_data['object_list'])
         return context_data
 
 
@@ -120,6 +143,11 @@ class SchedulerDetailView(LoginPermissionRequiredMixin, DetailView):
     model = Scheduler
     permission_required = 'outputs.view_scheduler'
 
+    def get_object(self, queryset=None):
+        scheduler = super().get_object(queryset)
+        Scheduler.prefetch_schedules([scheduler])
+        return scheduler
+
 
 class SchedulerDeleteView(LoginPermissionRequiredMixin, DeleteObjectMixin, DeleteView):
     model = Scheduler